@@ -0,0 +1,56 @@
+# Runs agent searches on a worker thread so a UI stays responsive while the
+# AI thinks. The GUI polls the returned future from the Tk event loop.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from search import SearchTimeout
+
+
+class BackgroundSearch:
+    def __init__(self):
+        # One thread, so a cancelled search finishes unwinding before the
+        # next one starts
+        self.executor = ThreadPoolExecutor(1)
+        self.future = None
+        self.agent = None
+        self.cancelled = None
+
+    def start(self, agent):
+        # The agent searches a copy of its engine, so the game on screen can
+        # be reset or redrawn while the search runs
+        self.cancel()
+        self.agent = agent
+        self.cancelled = threading.Event()
+        self.future = self.executor.submit(
+            self._search, agent, agent.engine.copy(), self.cancelled
+        )
+        return self.future
+
+    @staticmethod
+    def _search(agent, snapshot, cancelled):
+        engine = agent.engine
+        agent.engine, agent.cancelled = snapshot, cancelled
+        try:
+            return agent.get_move()
+        except SearchTimeout:
+            return None
+        finally:
+            agent.engine = engine
+
+    def nodes(self):
+        # Nodes searched so far by the running search of an instrumented agent
+        stats = getattr(self.agent, "last_stats", None)
+        return stats.nodes if stats is not None else None
+
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+            self.cancelled.set()
+            self.future = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
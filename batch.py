@@ -0,0 +1,162 @@
+# Pattern evaluation of many positions at once with NumPy, for offline jobs
+# such as self-play, book generation and analysis. Positions are stacked in
+# an (N, size, size) int8 array holding EMPTY, BLACK_STONE or WHITE_STONE;
+# the scores are those of PatternEvaluator, i.e. of Gomoku.evaluate_player.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from board import BLACK, WHITE, WIN_LENGTH
+from evaluator import evaluation_lines, patterns
+
+EMPTY, BLACK_STONE, WHITE_STONE = 0, 1, 2
+# Pads lines to a common length; matches no pattern character
+_WALL = 3
+# Cells read per table lookup, as one base-4 code
+_STEP = 5
+# Positions scored per pass, to bound the size of the temporary arrays
+CHUNK = 4096
+
+_gather_tables = {}
+_automata = {}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch evaluation requires numpy")
+
+
+def _gather_table(size, win_length):
+    # Indices into a flattened board of every line, cut into steps of _STEP
+    # cells: table[digit, step, line] is the cell read as the given digit of
+    # the code of that step. Lines are padded with the index one past the
+    # board's last cell.
+    table = _gather_tables.get((size, win_length))
+    if table is None:
+        lines = evaluation_lines(size, win_length)
+        steps = -(-max(len(line) for line in lines) // _STEP)
+        cells = np.full((len(lines), steps * _STEP), size * size, dtype=np.intp)
+        for line_id, line in enumerate(lines):
+            for pos, (row, col) in enumerate(line):
+                cells[line_id, pos] = row * size + col
+        table = cells.reshape(len(lines), steps, _STEP).transpose(2, 1, 0).copy()
+        _gather_tables[(size, win_length)] = table
+    return table
+
+
+def stack(boards):
+    # Board objects -> (N, size, size) int8 array
+    _require_numpy()
+    boards = list(boards)
+    size = boards[0].size if boards else 15
+    array = np.zeros((len(boards), size, size), dtype=np.int8)
+    for n, board in enumerate(boards):
+        for value, color in ((BLACK_STONE, BLACK), (WHITE_STONE, WHITE)):
+            for row, col in board.cells(board.bits(color)):
+                array[n, row, col] = value
+    return array
+
+
+def _match_step(matched, text, cell):
+    # str.count's matcher for one pattern: the length of the pattern prefix
+    # matched after reading `cell`, and whether a match ended there. The
+    # search resumes after a match, so it starts from nothing again.
+    seen = text[:matched] + (cell,)
+    for length in range(min(len(seen), len(text)), 0, -1):
+        if seen[-length:] == text[:length]:
+            return (0, 1) if length == len(text) else (length, 0)
+    return 0, 0
+
+
+def _automaton(win_length):
+    # The str.count matchers of every pattern for both colours run as one
+    # automaton reading _STEP cells at a time. Returns, indexed by state *
+    # 4**_STEP + cells code, the next state and an event, plus the pattern
+    # counts (black then white) each event adds.
+    automaton = _automata.get(win_length)
+    if automaton is None:
+        texts = [
+            tuple(stone if char == "#" else EMPTY for char in pattern)
+            for stone in (BLACK_STONE, WHITE_STONE)
+            for _, pattern, _ in patterns(win_length)
+        ]
+        # One cell at a time, over the states reachable from the start
+        start = (0,) * len(texts)
+        states, index, steps = [start], {start: 0}, []
+        for state in states:
+            row = []
+            for cell in range(4):
+                matched, found = zip(
+                    *(_match_step(m, text, cell) for m, text in zip(state, texts))
+                )
+                if matched not in index:
+                    index[matched] = len(states)
+                    states.append(matched)
+                row.append((index[matched], found))
+            steps.append(row)
+        next_state = np.array([[n for n, _ in row] for row in steps])
+        found = np.array([[f for _, f in row] for row in steps], dtype=np.int32)
+        # Then _STEP cells at a time, the first cell in the highest digit
+        codes = np.arange(4**_STEP)
+        state = np.repeat(np.arange(len(states)), len(codes))
+        codes = np.tile(codes, len(states))
+        counts = np.zeros((len(state), len(texts)), dtype=np.int32)
+        for digit in range(_STEP - 1, -1, -1):
+            cell = codes >> 2 * digit & 3
+            counts += found[state, cell]
+            state = next_state[state, cell]
+        increments, events = np.unique(counts, axis=0, return_inverse=True)
+        automaton = _automata[win_length] = (
+            state.astype(np.int32),
+            events.reshape(-1).astype(np.int32),
+            increments,
+        )
+    return automaton
+
+
+def pattern_counts(boards, win_length=WIN_LENGTH):
+    # (N, 2, len(PATTERNS)) non-overlapping pattern counts per position, for
+    # black then white, summed over the rows, columns and diagonals
+    _require_numpy()
+    boards = np.asarray(boards, dtype=np.int8)
+    count, size = boards.shape[0], boards.shape[-1]
+    table = _gather_table(size, win_length)
+    next_state, events, increments = _automaton(win_length)
+    counts = np.zeros((count, increments.shape[1]), dtype=np.int32)
+    for start in range(0, count, CHUNK):
+        flat = boards[start : start + CHUNK].reshape(-1, size * size)
+        chunk = flat.shape[0]
+        wall = np.full((chunk, 1), _WALL, dtype=np.int8)
+        cells = np.concatenate((flat, wall), axis=1)
+        # (chunk, steps, lines) base-4 codes of every _STEP cells of a line
+        codes = cells[:, table[0]].astype(np.int32)
+        for digit in table[1:]:
+            codes *= 4
+            codes += cells[:, digit]
+        state = np.zeros((chunk, table.shape[2]), dtype=np.int32)
+        seen = np.empty(codes.shape, dtype=np.int32)
+        for step in range(codes.shape[1]):
+            index = state * 4**_STEP + codes[:, step]
+            seen[:, step] = events[index]
+            state = next_state[index]
+        # Events per position, then the pattern counts they add up to
+        seen = seen.reshape(chunk, -1)
+        seen += (np.arange(chunk, dtype=np.int32) * len(increments))[:, None]
+        tally = np.bincount(seen.ravel(), minlength=chunk * len(increments))
+        counts[start : start + chunk] = tally.reshape(chunk, -1) @ increments
+    return counts.reshape(count, 2, len(increments[0]) // 2)
+
+
+def pattern_scores(boards, win_length=WIN_LENGTH):
+    # (N, 2) black and white pattern scores per position
+    weights = [value for _, _, value in patterns(win_length)]
+    return pattern_counts(boards, win_length) @ np.array(weights, dtype=np.int64)
+
+
+def evaluate(boards, color=WHITE, win_length=WIN_LENGTH):
+    # Gomoku.evaluate for every position: `color`'s score minus the other's
+    scores = pattern_scores(boards, win_length)
+    if color == WHITE:
+        return scores[:, 1] - scores[:, 0]
+    return scores[:, 0] - scores[:, 1]
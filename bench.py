@@ -0,0 +1,217 @@
+# Benchmarks for the engine hot paths, e.g.
+#   python bench.py --save baseline.json
+#   python bench.py --compare baseline.json --threshold 0.1
+import argparse
+import json
+import math
+import platform
+import sys
+import timeit
+import tracemalloc
+
+from game import GameEngine, Gomoku, MinimaxAgent, alpha_beta, pvs
+
+# Fixed positions as move lists, black first
+POSITIONS = {
+    "opening": [(7, 7), (8, 8), (6, 8), (8, 7)],
+    "midgame": [
+        (7, 7), (9, 8), (7, 9), (9, 7), (10, 7), (8, 8), (11, 8), (9, 5),
+        (8, 6), (12, 7), (9, 9), (10, 6), (7, 5), (8, 7), (10, 5), (6, 5),
+        (8, 5), (9, 4), (11, 7), (12, 9),
+    ],  # fmt: skip
+    "lategame": [
+        (7, 7), (5, 5), (8, 8), (9, 9), (3, 4), (9, 7), (7, 5), (7, 10),
+        (10, 8), (11, 9), (13, 9), (14, 7), (10, 6), (12, 10), (4, 2), (2, 4),
+        (1, 2), (10, 5), (5, 10), (14, 8), (7, 6), (10, 7), (6, 4), (5, 7),
+        (11, 6), (12, 9), (12, 8), (11, 7), (10, 9), (11, 11), (12, 7),
+        (10, 11), (0, 5), (9, 8), (9, 5), (12, 11), (6, 10), (0, 1), (6, 12),
+        (13, 11), (4, 12), (14, 12), (8, 7), (8, 6), (7, 9), (9, 3), (11, 8),
+        (6, 14), (4, 8), (13, 8), (8, 5), (7, 4), (4, 9), (4, 6), (5, 8),
+        (6, 11), (13, 10), (9, 10), (5, 4), (6, 7),
+    ],  # fmt: skip
+}
+
+SEARCH_DEPTHS = {"alpha_beta": 3, "pvs": 3, "minimax": 3}
+
+
+def engine_at(moves):
+    engine = GameEngine()
+    for row, col in moves:
+        engine.play_move(row, col)
+    return engine
+
+
+class CountingGomoku(Gomoku):
+    # alpha_beta evaluates every node it enters once
+    nodes = 0
+
+    def evaluate(self):
+        self.nodes += 1
+        return super().evaluate()
+
+
+class CountingMinimaxAgent(MinimaxAgent):
+    nodes = 0
+
+    def minimax(self, *args):
+        self.nodes += 1
+        return super().minimax(*args)
+
+
+def time_per_op(func, repeat=3):
+    # Best of `repeat` autoranged runs, in nanoseconds per call
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number * 1e9
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def micro_benchmarks(name, moves, pattern=None):
+    engine = engine_at(moves)
+    row, col = moves[-1]
+    color = engine.board.get(row, col)
+    gomoku = Gomoku(engine.board.copy())
+    cases = {
+        "checkwin": lambda: engine.checkwin(color),
+        "checkwin_at": lambda: engine.checkwin_at(row, col, color),
+        "available_moves": engine.available_moves,
+        "evaluate": gomoku.evaluate,
+        "get_nearby_moves": gomoku.get_nearby_moves,
+    }
+    return {
+        f"{case}/{name}": {"ns_per_op": time_per_op(func)}
+        for case, func in cases.items()
+        if not pattern or pattern in f"{case}/{name}"
+    }
+
+
+def search_benchmarks(name, moves, pattern=None):
+    engine = engine_at(moves)
+    maximizing = engine.get_current_player() == "white"
+    results = {}
+
+    def run_alpha_beta():
+        board = CountingGomoku(engine.board.copy())
+        alpha_beta(
+            board, SEARCH_DEPTHS["alpha_beta"], -math.inf, math.inf, maximizing
+        )
+        return board.nodes
+
+    def run_pvs():
+        board = CountingGomoku(engine.board.copy())
+        pvs(board, SEARCH_DEPTHS["pvs"], -math.inf, math.inf, maximizing)
+        return board.nodes
+
+    def run_minimax():
+        agent = CountingMinimaxAgent(engine, engine.get_current_player())
+        agent.minimax(SEARCH_DEPTHS["minimax"], True)
+        return agent.nodes
+
+    for case, run in (
+        ("alpha_beta", run_alpha_beta),
+        ("pvs", run_pvs),
+        ("minimax", run_minimax),
+    ):
+        if pattern and pattern not in f"{case}/{name}":
+            continue
+        # An untimed first run fills the pattern memo and the table caches,
+        # then the search is timed like the hot paths
+        nodes = run()
+        ns_per_op = time_per_op(run)
+        results[f"{case}/{name}"] = {
+            "ns_per_op": ns_per_op,
+            "nodes": nodes,
+            "nodes_per_sec": nodes / ns_per_op * 1e9,
+            "peak_bytes": peak_memory(run),
+        }
+    return results
+
+
+def run_benchmarks(pattern=None, searches=True):
+    results = {}
+    for name, moves in POSITIONS.items():
+        results.update(micro_benchmarks(name, moves, pattern))
+        if searches:
+            results.update(search_benchmarks(name, moves, pattern))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Returns (benchmark, metric, old, new) for every metric that got worse
+    # by more than `threshold` (a fraction)
+    regressions = []
+    for key, new in current["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        for metric, higher_is_better in (
+            ("ns_per_op", False),
+            ("nodes_per_sec", True),
+            ("peak_bytes", False),
+        ):
+            if metric not in old or metric not in new:
+                continue
+            if higher_is_better:
+                worse = new[metric] < old[metric] * (1 - threshold)
+            else:
+                worse = new[metric] > old[metric] * (1 + threshold)
+            if worse:
+                regressions.append((key, metric, old[metric], new[metric]))
+    return regressions
+
+
+def print_results(results):
+    for key, metrics in sorted(results["results"].items()):
+        line = f"{key:32} {metrics['ns_per_op']:>16,.0f} ns/op"
+        if "nodes_per_sec" in metrics:
+            line += f" {metrics['nodes']:>8} nodes {metrics['nodes_per_sec']:>10,.0f}"
+            line += f" nodes/s {metrics['peak_bytes'] / 1024:>8,.0f} KiB peak"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Gomoku engine")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed slowdown as a fraction (default 0.1)",
+    )
+    parser.add_argument("--filter", help="only run benchmarks containing this")
+    parser.add_argument(
+        "--no-search", action="store_true", help="skip the search benchmarks"
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, not args.no_search)
+    print_results(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, results, args.threshold)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {key} {metric}: {old:,.0f} -> {new:,.0f}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+from lines import cell_masks
+from zobrist import zobrist_keys
+
+BLACK = "black"
+WHITE = "white"
+WIN_LENGTH = 5
+
+
+def opponent(color):
+    return WHITE if color == BLACK else BLACK
+
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+
+class Board:
+    def __init__(self, size=15, win_length=WIN_LENGTH):
+        if not 4 <= win_length <= size:
+            raise ValueError(
+                f"Win length {win_length} does not fit a {size}x{size} board"
+            )
+        self.size = size
+        # Stones in a row needed to win; the tables built for this board
+        # (lines, windows, patterns, hash keys) are built per size and length
+        self.win_length = win_length
+        # Each row carries one always-empty padding column, so shifting a
+        # bitboard along a row or diagonal can never wrap onto the next row.
+        self.stride = size + 1
+        # horizontal, vertical, diagonal, anti-diagonal
+        self.shifts = (1, self.stride, self.stride + 1, self.stride - 1)
+        self.mask = 0
+        for row in range(size):
+            self.mask |= ((1 << size) - 1) << (row * self.stride)
+        self.black = 0
+        self.white = 0
+        self.stones = 0
+        # Zobrist hash of the stones, updated on every place/remove
+        self.black_keys, self.white_keys = zobrist_keys(size, win_length)
+        # Per cell and direction, the neighbours and winning windows through it
+        self.win_masks = cell_masks(size, win_length)
+        self.hash = 0
+        # Objects keeping incremental state (evaluators, hashes, ...) in sync
+        # with the stones; they get on_place/on_remove after every change.
+        self.trackers = []
+
+    def attach(self, tracker):
+        self.trackers.append(tracker)
+
+    def detach(self, tracker):
+        self.trackers.remove(tracker)
+
+    def index(self, row, col):
+        return row * self.stride + col
+
+    def position(self, index):
+        return divmod(index, self.stride)
+
+    def in_bounds(self, row, col):
+        return 0 <= row < self.size and 0 <= col < self.size
+
+    def bits(self, color):
+        return self.black if color == BLACK else self.white
+
+    def get(self, row, col):
+        bit = 1 << (row * self.stride + col)
+        if self.black & bit:
+            return BLACK
+        if self.white & bit:
+            return WHITE
+        return None
+
+    def is_empty(self, row, col):
+        return not (self.black | self.white) >> (row * self.stride + col) & 1
+
+    def place(self, row, col, color):
+        index = row * self.stride + col
+        bit = 1 << index
+        if color == BLACK:
+            self.black |= bit
+            self.hash ^= self.black_keys[index]
+        else:
+            self.white |= bit
+            self.hash ^= self.white_keys[index]
+        self.stones += 1
+        for tracker in self.trackers:
+            tracker.on_place(row, col, color)
+
+    def remove(self, row, col):
+        index = row * self.stride + col
+        bit = 1 << index
+        if self.black & bit:
+            color = BLACK
+            self.hash ^= self.black_keys[index]
+        else:
+            color = WHITE
+            self.hash ^= self.white_keys[index]
+        self.black &= ~bit
+        self.white &= ~bit
+        self.stones -= 1
+        for tracker in self.trackers:
+            tracker.on_remove(row, col, color)
+
+    def copy(self):
+        # Trackers belong to the original board and are not carried over
+        other = Board.__new__(Board)
+        other.__dict__.update(self.__dict__)
+        other.trackers = []
+        return other
+
+    @classmethod
+    def from_bits(cls, size, black, white, win_length=WIN_LENGTH):
+        # Rebuilds a board from its two bitboards, e.g. in another process
+        board = cls(size, win_length)
+        for color, bits in ((BLACK, black), (WHITE, white)):
+            for row, col in board.cells(bits):
+                board.place(row, col, color)
+        return board
+
+    def is_full(self):
+        return self.stones == self.size * self.size
+
+    def has_five(self, color):
+        bits = self.bits(color)
+        for shift in self.shifts:
+            run = bits
+            for _ in range(self.win_length - 1):
+                run &= run >> shift
+                if not run:
+                    break
+            if run:
+                return True
+        return False
+
+    def has_five_at(self, row, col, color):
+        bits = self.bits(color)
+        for neighbours, windows in self.win_masks[row * self.stride + col]:
+            if bits & neighbours:
+                for mask in windows:
+                    if bits & mask == mask:
+                        return True
+        return False
+
+    def run_counts(self, color, longest):
+        # counts[n] is the number of (overlapping) runs of n + 1 stones in all
+        # directions, for every length up to `longest`, in a single pass
+        bits = self.bits(color)
+        counts = [0] * longest
+        for shift in self.shifts:
+            run = bits
+            counts[0] += popcount(run)
+            for n in range(1, longest):
+                run &= bits >> (shift * n)
+                if not run:
+                    break
+                counts[n] += popcount(run)
+        return counts
+
+    def count_runs(self, color, length):
+        return self.run_counts(color, length)[length - 1]
+
+    def cells(self, bits):
+        result = []
+        while bits:
+            low = bits & -bits
+            result.append(divmod(low.bit_length() - 1, self.stride))
+            bits ^= low
+        return result
+
+    def empty_cells(self):
+        return self.cells(self.mask & ~(self.black | self.white))
+
+    def neighbourhood(self, radius):
+        occupied = self.black | self.white
+        area = occupied
+        for _ in range(radius):
+            area |= (area << 1 | area >> 1) & self.mask
+        for _ in range(radius):
+            area |= (area << self.stride | area >> self.stride) & self.mask
+        return area & ~occupied
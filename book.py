@@ -0,0 +1,166 @@
+# Opening book: the best move of early positions, found offline by deep
+# self-play search, e.g.
+#   python book.py --plies 8 --width 4 --depth 3 --out opening_book.bin
+# Positions are keyed by their canonical hash (see symmetry.py), so the 8
+# symmetric images of a position share one entry. The file is a header and
+# fixed-size entries sorted by key; it is memory-mapped and binary-searched.
+import argparse
+import mmap
+import os
+import struct
+import time
+
+from board import WIN_LENGTH
+from search import Gomoku
+from symmetry import canonical, from_canonical, to_canonical
+
+MAGIC = b"GMKB"
+VERSION = 1
+# magic, version, board size, most stones in any entry, number of entries
+HEADER = struct.Struct("<4sHHHI")
+# canonical hash, canonical move as row * size + col
+ENTRY = struct.Struct("<QH")
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"
+)
+
+
+class OpeningBook:
+    def __init__(self, path=None):
+        self.size = None
+        self.max_stones = -1
+        self.count = 0
+        self.data = None
+        if path is not None:
+            self._open(path)
+
+    def _open(self, path):
+        with open(path, "rb") as f:
+            magic, version, size, max_stones, count = HEADER.unpack(
+                f.read(HEADER.size)
+            )
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an opening book")
+            if count:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size, self.max_stones, self.count = size, max_stones, count
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+            self.count = 0
+
+    def _find(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry_key, move = ENTRY.unpack_from(
+                self.data, HEADER.size + middle * ENTRY.size
+            )
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                return move
+        return None
+
+    def lookup(self, board):
+        # The book move for the position on `board`, or None. Books are
+        # searched with five in a row to win.
+        if board.size != self.size or board.stones > self.max_stones:
+            return None
+        if board.win_length != WIN_LENGTH:
+            return None
+        key, t = canonical(board)
+        move = self._find(key)
+        if move is None:
+            return None
+        row, col = from_canonical(t, divmod(move, self.size), self.size)
+        if not board.is_empty(row, col):
+            # Only a hash collision can point at an occupied cell
+            return None
+        return row, col
+
+
+def write_book(path, size, entries):
+    # entries maps canonical hash -> (stones, canonical (row, col))
+    max_stones = max((stones for stones, _ in entries.values()), default=0)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, size, max_stones, len(entries)))
+        for key in sorted(entries):
+            row, col = entries[key][1]
+            f.write(ENTRY.pack(key, row * size + col))
+
+
+_default_book = None
+
+
+def default_book():
+    # The book shipped next to this module, loaded once; empty if missing
+    global _default_book
+    if _default_book is None:
+        if os.path.exists(DEFAULT_PATH):
+            _default_book = OpeningBook(DEFAULT_PATH)
+        else:
+            _default_book = OpeningBook()
+    return _default_book
+
+
+def generate(size=15, plies=8, width=4, depth=3, log=None):
+    # Searches every position reached by playing, from the empty board, the
+    # `width` best candidates at each of the first `plies` moves
+    from game import AlphaBetaAgent, GameEngine  # game imports book
+
+    entries = {}
+    frontier = [[]]
+    for ply in range(plies):
+        next_frontier = []
+        for moves in frontier:
+            engine = GameEngine(size)
+            for row, col in moves:
+                engine.play_move(row, col)
+            key, t = canonical(engine.board)
+            if key in entries or engine.is_game_over():
+                continue
+            agent = AlphaBetaAgent(
+                engine, engine.get_current_player(), max_depth=depth, book=None
+            )
+            move = agent.get_move()
+            entries[key] = (engine.board.stones, to_canonical(t, move, size))
+            candidates = Gomoku(engine.board.copy()).get_nearby_moves()
+            children = [move] + [m for m in candidates if m != move][: width - 1]
+            next_frontier.extend(moves + [child] for child in children)
+        frontier = next_frontier
+        if log is not None:
+            log(f"ply {ply + 1}: {len(entries)} positions")
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a Gomoku opening book")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    parser.add_argument("--size", type=int, default=15)
+    parser.add_argument("--plies", type=int, default=8, help="book moves per game")
+    parser.add_argument(
+        "--width", type=int, default=4, help="moves explored at every position"
+    )
+    parser.add_argument("--depth", type=int, default=3, help="alpha-beta depth")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    entries = generate(args.size, args.plies, args.width, args.depth, print)
+    write_book(args.out, args.size, entries)
+    print(
+        f"wrote {len(entries)} positions to {args.out}"
+        f" in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
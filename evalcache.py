@@ -0,0 +1,86 @@
+# Bounded cache of position evaluations keyed by Zobrist hash. One cache
+# can be shared by every evaluator computing the same score, e.g. the
+# Gomoku classes of game.py and alpha_beta.py.
+from collections import OrderedDict
+
+
+class EvaluationCache:
+    EVICTION_POLICIES = ("lru", "clock")
+
+    def __init__(self, capacity=1 << 16, eviction="lru"):
+        if eviction not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+        self.capacity = capacity
+        self.eviction = eviction
+        self.clear()
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.eviction == "lru":
+            # key -> score, least recently used first
+            self.entries = OrderedDict()
+        else:
+            # key -> (score, slot); the clock hand sweeps the slots and
+            # evicts the first one not read since the hand last passed it
+            self.entries = {}
+            self.slots = []
+            self.referenced = []
+            self.hand = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == "lru":
+            self.entries.move_to_end(key)
+            return entry
+        self.referenced[entry[1]] = True
+        return entry[0]
+
+    def put(self, key, score):
+        if self.eviction == "lru":
+            self.entries[key] = score
+            if len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries[key] = (score, entry[1])
+            return
+        if len(self.slots) < self.capacity:
+            slot = len(self.slots)
+            self.slots.append(key)
+            self.referenced.append(False)
+        else:
+            while self.referenced[self.hand]:
+                self.referenced[self.hand] = False
+                self.hand = (self.hand + 1) % self.capacity
+            slot = self.hand
+            del self.entries[self.slots[slot]]
+            self.evictions += 1
+            self.slots[slot] = key
+            self.referenced[slot] = False
+            self.hand = (self.hand + 1) % self.capacity
+        self.entries[key] = (score, slot)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "size": len(self.entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate(),
+        }
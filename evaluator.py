@@ -0,0 +1,150 @@
+from board import BLACK, WIN_LENGTH
+
+# Pattern weights of the original string-matching evaluation. Each pattern
+# is written with "#" standing for the player's stone.
+PATTERNS = (
+    ("five", "#####", 100000),
+    ("open_four", ".####.", 10000),
+    ("blocked_four", "####.", 1000),
+    ("open_three", ".###.", 500),
+    ("blocked_three", "###.", 100),
+    ("open_two", ".##.", 50),
+)
+
+_patterns = {WIN_LENGTH: PATTERNS}
+_line_tables = {}
+_line_scores = {}
+_LINE_SCORE_LIMIT = 1 << 18
+
+
+def patterns(win_length=WIN_LENGTH):
+    # PATTERNS for another win length: every run of stones is lengthened or
+    # shortened by the difference, keeping the names and weights
+    table = _patterns.get(win_length)
+    if table is None:
+        extra = win_length - WIN_LENGTH
+        table = _patterns[win_length] = tuple(
+            (name, pattern.replace("#", "#" * (1 + extra), 1), value)
+            for name, pattern, value in PATTERNS
+        )
+    return table
+
+
+def evaluation_lines(size, win_length=WIN_LENGTH):
+    # Rows, columns and diagonals as cell lists, in the reading direction of
+    # the original string scan. Anti-diagonals only cover the segments that
+    # scan visited, so totals stay identical to the old evaluate_player.
+    lines = [[(x, y) for y in range(size)] for x in range(size)]
+    lines += [[(x, y) for x in range(size)] for y in range(size)]
+    for d in range(-size + 1, size):
+        lines.append(
+            [
+                (i, i - d)
+                for i in range(max(d, 0), min(size + d, size))
+                if 0 <= i - d < size
+            ]
+        )
+        lines.append(
+            [
+                (i, size - 1 - i + d)
+                for i in range(max(-d, 0), min(size - d, size))
+                if 0 <= size - 1 - i + d < size
+            ]
+        )
+    # Lines shorter than every pattern never score
+    shortest = min(len(pattern) for _, pattern, _ in patterns(win_length))
+    return [line for line in lines if len(line) >= shortest]
+
+
+def line_table(board):
+    config = (board.size, board.win_length)
+    table = _line_tables.get(config)
+    if table is None:
+        lines = evaluation_lines(*config)
+        cell_lines = {}
+        for line_id, line in enumerate(lines):
+            for pos, (x, y) in enumerate(line):
+                cell = board.index(x, y)
+                cell_lines.setdefault(cell, []).append((line_id, 1 << pos))
+        table = _line_tables[config] = (lines, cell_lines)
+    return table
+
+
+def score_line(length, black, white, win_length=WIN_LENGTH):
+    # (black score, white score) of one line given its stone masks
+    key = (length, black, white, win_length)
+    scores = _line_scores.get(key)
+    if scores is None:
+        line = "".join(
+            "X" if black >> i & 1 else "O" if white >> i & 1 else "."
+            for i in range(length)
+        )
+        scores = tuple(
+            sum(
+                line.count(pattern.replace("#", symbol)) * value
+                for _, pattern, value in patterns(win_length)
+            )
+            for symbol in ("X", "O")
+        )
+        if len(_line_scores) >= _LINE_SCORE_LIMIT:
+            _line_scores.clear()
+        _line_scores[key] = scores
+    return scores
+
+
+class PatternEvaluator:
+    # The anti-diagonals are scanned from one side only, so mirror images
+    # of a position can score differently; see Gomoku(symmetric=True)
+    symmetric = False
+
+    def __init__(self, board):
+        self.board = board
+        self.win_length = board.win_length
+        self.lines, self.cell_lines = line_table(board)
+        self.lengths = [len(line) for line in self.lines]
+        self.line_black = [0] * len(self.lines)
+        self.line_white = [0] * len(self.lines)
+        self.line_scores = [(0, 0)] * len(self.lines)
+        self.black_score = 0
+        self.white_score = 0
+        for line_id, line in enumerate(self.lines):
+            for pos, (x, y) in enumerate(line):
+                color = board.get(x, y)
+                if color == BLACK:
+                    self.line_black[line_id] |= 1 << pos
+                elif color is not None:
+                    self.line_white[line_id] |= 1 << pos
+            self._rescore(line_id)
+        board.attach(self)
+
+    def close(self):
+        self.board.detach(self)
+
+    def _rescore(self, line_id):
+        old_black, old_white = self.line_scores[line_id]
+        scores = score_line(
+            self.lengths[line_id],
+            self.line_black[line_id],
+            self.line_white[line_id],
+            self.win_length,
+        )
+        self.line_scores[line_id] = scores
+        self.black_score += scores[0] - old_black
+        self.white_score += scores[1] - old_white
+
+    def on_place(self, row, col, color):
+        for line_id, bit in self.cell_lines.get(row * self.board.stride + col, ()):
+            if color == BLACK:
+                self.line_black[line_id] |= bit
+            else:
+                self.line_white[line_id] |= bit
+            self._rescore(line_id)
+
+    def on_remove(self, row, col, color):
+        for line_id, bit in self.cell_lines.get(row * self.board.stride + col, ()):
+            self.line_black[line_id] &= ~bit
+            self.line_white[line_id] &= ~bit
+            self._rescore(line_id)
+
+    def score(self, color):
+        return self.black_score if color == BLACK else self.white_score
@@ -1,92 +1,114 @@
 import random
 import math
 import time
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, wait
+
+from board import Board, BLACK, WHITE
+from book import default_book
+from evalcache import EvaluationCache
+from evaluator import PatternEvaluator
+from moves import MoveOrdering
+# The search constants are re-exported for code importing them from here
+from search import (
+    EMPTY,
+    HUMAN,
+    AI,
+    BOARD_SIZE,
+    WIN_LENGTH,
+    MAX_DEPTH,
+    Gomoku,
+    SearchTimeout,
+    alpha_beta,
+    pvs,
+    pvs_lmr,
+)
+from threats import ThreatSearch
+from stats import SearchStats, GameStats
+from tactics import immediate_move, tactics_for
+from windows import WindowCounts
+from zobrist import TranspositionTable, EXACT
 
 
 class GameEngine:
-    def __init__(self, board_size=15):
+    def __init__(self, board_size=15, win_length=WIN_LENGTH):
         self.BOARD_SIZE = board_size
+        self.WIN_LENGTH = win_length
         self.CELL_SIZE = 45
         self.WINDOW_SIZE = self.CELL_SIZE * self.BOARD_SIZE
-        self.board = [
-            [None for _ in range(self.BOARD_SIZE)] for _ in range(self.BOARD_SIZE)
-        ]
+        self.board = Board(self.BOARD_SIZE, self.WIN_LENGTH)
         self.current_player = "black"
         self.winner = None
         self.game_over = False
+        self.last_move = None
+        # Every move played, for game records (see records.py)
+        self.moves = []
 
     def reset(self):
-        self.board = [
-            [None for _ in range(self.BOARD_SIZE)] for _ in range(self.BOARD_SIZE)
-        ]
+        self.board = Board(self.BOARD_SIZE, self.WIN_LENGTH)
         self.current_player = "black"
         self.winner = None
         self.game_over = False
+        self.last_move = None
+        self.moves = []
+
+    def copy(self):
+        engine = GameEngine(self.BOARD_SIZE, self.WIN_LENGTH)
+        engine.board = self.board.copy()
+        engine.current_player = self.current_player
+        engine.winner = self.winner
+        engine.game_over = self.game_over
+        engine.last_move = self.last_move
+        engine.moves = list(self.moves)
+        return engine
 
     def printboard(self):
         print("  " + " ".join(f"{i:2}" for i in range(self.BOARD_SIZE)))
         for row in range(self.BOARD_SIZE):
             row_str = f"{row:2} "
             for col in range(self.BOARD_SIZE):
-                if self.board[row][col] == "black":
+                if self.board.get(row, col) == "black":
                     row_str += "B "
-                elif self.board[row][col] == "white":
+                elif self.board.get(row, col) == "white":
                     row_str += "W "
                 else:
                     row_str += ". "
             print(row_str)
 
     def checkwin(self, color):
-        for row in range(self.BOARD_SIZE):
-            for col in range(self.BOARD_SIZE):
-                if self.board[row][col] == color:
-                    # horizontal
-                    if col + 4 < self.BOARD_SIZE:
-                        if all(self.board[row][col + i] == color for i in range(5)):
-                            return True
-                    # vertical
-                    if row + 4 < self.BOARD_SIZE:
-                        if all(self.board[row + i][col] == color for i in range(5)):
-                            return True
-                    # diagonal
-                    if row + 4 < self.BOARD_SIZE and col + 4 < self.BOARD_SIZE:
-                        if all(self.board[row + i][col + i] == color for i in range(5)):
-                            return True
-                    # diagonal bel3aks
-                    if row + 4 < self.BOARD_SIZE and col - 4 >= 0:
-                        if all(self.board[row + i][col - i] == color for i in range(5)):
-                            return True
-        return False
+        return self.board.has_five(color)
+
+    def checkwin_at(self, row, col, color):
+        # only the four lines through the stone just placed can hold a new five
+        return self.board.has_five_at(row, col, color)
 
     def is_valid_move(self, row, col):  # boundries and empty
         return (
             0 <= row < self.BOARD_SIZE
             and 0 <= col < self.BOARD_SIZE
-            and self.board[row][col] is None
+            and self.board.is_empty(row, col)
         )
 
     def make_move(self, row, col, color):
         if self.is_valid_move(row, col):
-            self.board[row][col] = color
+            self.board.place(row, col, color)
             return True
         return False
 
     def available_moves(self):
-        return [
-            (row, col)
-            for row in range(self.BOARD_SIZE)
-            for col in range(self.BOARD_SIZE)
-            if self.board[row][col] is None
-        ]
+        return self.board.empty_cells()
 
     def play_move(self, row, col):
         if self.game_over or not self.is_valid_move(row, col):
             return False
         self.make_move(row, col, self.current_player)
-        if self.checkwin(self.current_player):
+        self.last_move = (row, col)
+        self.moves.append(self.last_move)
+        if self.checkwin_at(row, col, self.current_player):
             self.winner = self.current_player
             self.game_over = True
-        elif not self.available_moves():
+        elif self.board.is_full():
             self.game_over = True
         else:
             self.current_player = "white" if self.current_player == "black" else "black"
@@ -103,14 +125,22 @@ class GameEngine:
 
 
 class RandomAgent:
-    def __init__(self, engine, color):
+    def __init__(self, engine, color, tactical=False, rng=None):
         self.engine = engine
         self.color = color
+        # Take immediate wins and blocks instead of a random cell
+        self.tactical = tactical
+        # A random.Random for reproducible games; the random module if None
+        self.rng = rng if rng is not None else random
 
     def get_move(self):
+        if self.tactical:
+            move = immediate_move(self.engine.board, self.color)
+            if move is not None:
+                return move
         moves = self.engine.available_moves()
         if moves:
-            return random.choice(moves)
+            return self.rng.choice(moves)
         return None
 
     def make_move(self):
@@ -221,169 +251,386 @@ def random_vs_alphabeta():
         print("Draw!")
 
 
-# Alpha Beta constants
-EMPTY = "."
-HUMAN = "X"
-AI = "O"
-BOARD_SIZE = 15
-WIN_LENGTH = 5
-MAX_DEPTH = 2
-
-
-class Gomoku:
-    def __init__(self):
-        self.board = [[EMPTY for _ in range(BOARD_SIZE)] for _ in range(BOARD_SIZE)]
-
-    def print_board(self):
-        print("  " + " ".join(f"{i:2}" for i in range(BOARD_SIZE)))
-        for i, row in enumerate(self.board):
-            print(f"{i:2} " + "  ".join(row))
-
-    def is_valid_move(self, x, y):
-        return 0 <= x < BOARD_SIZE and 0 <= y < BOARD_SIZE and self.board[x][y] == EMPTY
-
-    def make_move(self, x, y, player):
-        if self.is_valid_move(x, y):
-            self.board[x][y] = player
-            return True
-        return False
-
-    def undo_move(self, x, y):
-        self.board[x][y] = EMPTY
-
-    def check_win(self, player):
-        directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
-        for x in range(BOARD_SIZE):
-            for y in range(BOARD_SIZE):
-                if self.board[x][y] != player:
-                    continue
-                for dx, dy in directions:
-                    if all(
-                        0 <= x + i * dx < BOARD_SIZE
-                        and 0 <= y + i * dy < BOARD_SIZE
-                        and self.board[x + i * dx][y + i * dy] == player
-                        for i in range(WIN_LENGTH)
-                    ):
-                        return True
-        return False
-
-    def get_nearby_moves(self, radius=2):
-        nearby = set()
-        for x in range(BOARD_SIZE):
-            for y in range(BOARD_SIZE):
-                if self.board[x][y] != EMPTY:
-                    for dx in range(-radius, radius + 1):
-                        for dy in range(-radius, radius + 1):
-                            nx, ny = x + dx, y + dy
-                            if 0 <= nx < BOARD_SIZE and 0 <= ny < BOARD_SIZE:
-                                if self.board[nx][ny] == EMPTY:
-                                    nearby.add((nx, ny))
-        return list(nearby) if nearby else [(BOARD_SIZE // 2, BOARD_SIZE // 2)]
-
-    def evaluate(self):
-        return self.evaluate_player(AI) - self.evaluate_player(HUMAN)
-
-    def evaluate_player(self, player):
-        patterns = {
-            "five": (f"{player}" * 5, 100000),
-            "open_four": (f".{player*4}.", 10000),
-            "blocked_four": (f"{player*4}.", 1000),
-            "open_three": (f".{player*3}.", 500),
-            "blocked_three": (f"{player*3}.", 100),
-            "open_two": (f".{player*2}.", 50),
-        }
-
-        score = 0
-        lines = []
-
-        # Get all rows, columns, diagonals
-        for row in self.board:
-            lines.append("".join(row))
-        for col in zip(*self.board):
-            lines.append("".join(col))
-        for d in range(-BOARD_SIZE + 1, BOARD_SIZE):
-            lines.append(
-                "".join(
-                    self.board[i][i - d]
-                    for i in range(max(d, 0), min(BOARD_SIZE + d, BOARD_SIZE))
-                    if 0 <= i - d < BOARD_SIZE
-                )
-            )
-            lines.append(
-                "".join(
-                    self.board[i][BOARD_SIZE - 1 - i + d]
-                    for i in range(max(-d, 0), min(BOARD_SIZE - d, BOARD_SIZE))
-                    if 0 <= BOARD_SIZE - 1 - i + d < BOARD_SIZE
-                )
-            )
-
-        for line in lines:
-            for pat, val in patterns.values():
-                score += line.count(pat) * val
-
-        return score
-
-
-def alpha_beta(board, depth, alpha, beta, maximizing):
-    score = board.evaluate()
-    if abs(score) >= 100000 or depth == 0:
-        return score, None
-
-    best_move = None
-    moves = board.get_nearby_moves()
-
-    if maximizing:
-        max_eval = -math.inf
-        for move in moves:
-            board.make_move(*move, AI)
-            eval, _ = alpha_beta(board, depth - 1, alpha, beta, False)
-            board.undo_move(*move)
-            if eval > max_eval:
-                max_eval = eval
-                best_move = move
-            alpha = max(alpha, eval)
-            if beta <= alpha:
-                break
-        return max_eval, best_move
-    else:
-        min_eval = math.inf
-        for move in moves:
-            board.make_move(*move, HUMAN)
-            eval, _ = alpha_beta(board, depth - 1, alpha, beta, True)
-            board.undo_move(*move)
-            if eval < min_eval:
-                min_eval = eval
-                best_move = move
-            beta = min(beta, eval)
-            if beta <= alpha:
-                break
-        return min_eval, best_move
+# Iterative deepening limits
+MAX_ITERATIVE_DEPTH = 20
+ASPIRATION_WINDOW = 500
+# Seconds between checks of `cancelled` while waiting for worker processes
+CANCEL_POLL = 0.02
+
+# Searches and evaluators AlphaBetaAgent also accepts by name, e.g. from
+# tournament specs
+SEARCHES = {"alpha_beta": alpha_beta, "pvs": pvs, "pvs_lmr": pvs_lmr}
+EVALUATORS = {"patterns": PatternEvaluator, "windows": WindowCounts}
+
+
+# State of a root-splitting worker process, set up by _init_search_worker
+_worker = {}
+
+
+def _init_search_worker(
+    shared_bound, cancel, beam_width, symmetric_tt, search_function, evaluator
+):
+    _worker["bound"] = shared_bound
+    # A multiprocessing.Event the agent sets to stop every worker's search
+    _worker["cancel"] = cancel
+    _worker["symmetric_tt"] = symmetric_tt
+    _worker["search"] = search_function
+    _worker["evaluator"] = evaluator
+    _worker["tt"] = TranspositionTable()
+    _worker["ordering"] = MoveOrdering(beam_width)
+
+
+def _search_root_move(
+    config, black, white, move, depth, alpha, beta, maximizing, end, instrument
+):
+    # Searches one root move in a worker. The board arrives as its (size,
+    # win length) and its two bitboards; `end` is a wall-clock deadline
+    # (time.time()) or None.
+    # Returns the score and the worker's stats counters (or None).
+    stats = SearchStats() if instrument else None
+    bound = _worker["bound"]
+    with bound.get_lock():
+        if maximizing:
+            alpha = max(alpha, bound.value)
+        else:
+            beta = min(beta, bound.value)
+    if alpha >= beta:
+        # Another worker already found a move at least this good
+        return None, None
+    deadline = None
+    if end is not None:
+        deadline = time.perf_counter() + end - time.time()
+    board = Gomoku(
+        Board.from_bits(config[0], black, white, config[1]),
+        _worker["ordering"],
+        _worker["symmetric_tt"],
+        evaluator=_worker["evaluator"],
+    )
+    board.make_move(*move, AI if maximizing else HUMAN)
+    _worker["tt"].new_search()
+    try:
+        score, _ = _worker["search"](
+            board,
+            depth - 1,
+            alpha,
+            beta,
+            not maximizing,
+            _worker["tt"],
+            deadline,
+            stats,
+            _worker["cancel"],
+        )
+    except SearchTimeout:
+        return SearchTimeout, None
+    with bound.get_lock():
+        if maximizing:
+            bound.value = max(bound.value, score)
+        else:
+            bound.value = min(bound.value, score)
+    return score, stats.counters() if stats is not None else None
 
 
 class AlphaBetaAgent:
-    def __init__(self, engine, color, max_depth=2):
+    def __init__(
+        self,
+        engine,
+        color,
+        max_depth=2,
+        tt_size=1 << 18,
+        tt_replacement="depth",
+        symmetric_tt=False,
+        eval_cache=None,
+        time_limit_ms=None,
+        beam_width=None,
+        threat_search="vcf",
+        threat_nodes=2000,
+        workers=1,
+        instrument=False,
+        book=True,
+        search_function=alpha_beta,
+        evaluator=PatternEvaluator,
+    ):
         self.engine = engine
         self.color = color  # 'black' or 'white'
         self.max_depth = max_depth
+        # Called like search.alpha_beta, so other searches can be swapped in:
+        # pvs for principal variation search, pvs_lmr to add late move
+        # reductions
+        if isinstance(search_function, str):
+            if search_function not in SEARCHES:
+                raise ValueError(f"Unknown search: {search_function}")
+            search_function = SEARCHES[search_function]
+        self.search_function = search_function
+        # The Gomoku evaluator: PatternEvaluator, or WindowCounts to score
+        # from the stone counts of every winning window
+        if isinstance(evaluator, str):
+            if evaluator not in EVALUATORS:
+                raise ValueError(f"Unknown evaluator: {evaluator}")
+            evaluator = EVALUATORS[evaluator]
+        self.evaluator = evaluator
+        if symmetric_tt and not getattr(evaluator, "symmetric", False):
+            raise ValueError(
+                f"symmetric_tt needs a symmetric evaluator, not {evaluator.__name__}"
+            )
+        # With a time limit the agent deepens until the budget runs out
+        # instead of searching to max_depth
+        self.time_limit_ms = time_limit_ms
+        # Kept for the whole game so later moves reuse earlier searches
+        self.tt = TranspositionTable(tt_size, tt_replacement)
+        # Fold the 8 symmetric images of a position into one table entry;
+        # needs a symmetric evaluator such as WindowCounts
+        self.symmetric_tt = symmetric_tt
+        # An EvaluationCache kept for the whole game, or None
+        self.eval_cache = eval_cache
+        # Killer and history tables, also kept between moves
+        self.ordering = MoveOrdering(beam_width)
+        # Forced wins are looked for with a threat-space search before the
+        # full-width one: "vcf" tries fours, "vct" fours and threes
+        if threat_search not in (None, "vcf", "vct"):
+            raise ValueError(f"Unknown threat search mode: {threat_search}")
+        self.threats = None
+        if threat_search is not None:
+            self.threats = ThreatSearch(threat_nodes, threes=threat_search == "vct")
+        # With more than one worker the root moves are split across a
+        # process pool, which is started on the first search
+        self.workers = workers
+        self.beam_width = beam_width
+        self.pool = None
+        self.shared_bound = None
+        self.worker_cancel = None
+        # Opt-in statistics: last_stats covers the latest search, game_stats
+        # every search this agent has made
+        self.instrument = instrument
+        self.last_stats = None
+        self.game_stats = GameStats()
+        # Setting this from another thread stops the search in progress
+        self.cancelled = threading.Event()
+        self.last_depth = 0
+        self.last_score = None
+        # Book positions are answered without searching; True means the
+        # book shipped with the game, None or False no book
+        self.book = default_book() if book is True else book or None
 
     def get_move(self):
-        # Translate engine board to Gomoku board
-        gomoku_board = Gomoku()
-        for row in range(self.engine.BOARD_SIZE):
-            for col in range(self.engine.BOARD_SIZE):
-                val = self.engine.board[row][col]
-                if val == "black":
-                    gomoku_board.board[row][col] = HUMAN
-                elif val == "white":
-                    gomoku_board.board[row][col] = AI
-                else:
-                    gomoku_board.board[row][col] = EMPTY
+        if self.instrument:
+            self.last_stats = SearchStats(f"AlphaBetaAgent({self.color})")
+        # The time limit covers the whole move, checks and threat search too
+        deadline = None
+        if self.time_limit_ms is not None:
+            deadline = time.perf_counter() + self.time_limit_ms / 1000
+        move = self.choose_move(deadline)
+        if self.last_stats is not None:
+            self.last_stats.finish(self.last_depth, self.last_score, move)
+            self.game_stats.add(self.last_stats)
+            self.last_stats.log()
+        return move
+
+    def choose_move(self, deadline=None):
         maximizing = self.color == "white"
-        _, move = alpha_beta(
-            gomoku_board, self.max_depth, -math.inf, math.inf, maximizing
+        self.last_depth, self.last_score = 0, None
+        wins, blocks = tactics_for(self.engine.board).precheck(self.color)
+        if wins:
+            self.last_score = 100000 if maximizing else -100000
+            return wins[0]
+        if blocks:
+            return blocks[0]
+        if self.book is not None:
+            move = self.book.lookup(self.engine.board)
+            if move is not None:
+                return move
+        if self.threats is not None:
+            line = self.threats.find_win(self.engine.board, self.color, deadline)
+            if self.last_stats is not None:
+                self.last_stats.threat_nodes += self.threats.nodes
+            if line:
+                self.last_depth = len(line)
+                self.last_score = 100000 if maximizing else -100000
+                return line[0]
+        self.tt.new_search()
+        self.ordering.new_search()
+        # The search makes and undoes its moves on the engine's own board
+        gomoku_board = Gomoku(
+            self.engine.board,
+            self.ordering,
+            self.symmetric_tt,
+            self.eval_cache,
+            self.evaluator,
         )
+        try:
+            if deadline is not None:
+                return self.iterative_deepening(gomoku_board, maximizing, deadline)
+            score, move = self.search(
+                gomoku_board, self.max_depth, -math.inf, math.inf, maximizing
+            )
+        finally:
+            gomoku_board.close()
+        self.last_depth, self.last_score = self.max_depth, score
         return move
 
+    def search(self, board, depth, alpha, beta, maximizing, deadline=None):
+        if self.workers <= 1 or depth < 2:
+            stats = self.last_stats
+            return self.search_function(
+                board,
+                depth,
+                alpha,
+                beta,
+                maximizing,
+                self.tt,
+                deadline,
+                stats,
+                self.cancelled,
+            )
+        return self.parallel_search(board, depth, alpha, beta, maximizing, deadline)
+
+    def parallel_search(self, board, depth, alpha, beta, maximizing, deadline):
+        if self.pool is None:
+            self.shared_bound = multiprocessing.Value("d", 0.0)
+            self.worker_cancel = multiprocessing.Event()
+            self.pool = ProcessPoolExecutor(
+                self.workers,
+                initializer=_init_search_worker,
+                initargs=(
+                    self.shared_bound,
+                    self.worker_cancel,
+                    self.beam_width,
+                    self.symmetric_tt,
+                    self.search_function,
+                    self.evaluator,
+                ),
+            )
+        key, frame = board.tt_key(maximizing)
+        entry = self.tt.lookup(key)
+        tt_move = board.from_frame(frame, entry[4]) if entry else None
+        moves = board.get_nearby_moves(depth=depth, tt_move=tt_move)
+        if not moves:
+            return board.evaluate(), None
+
+        # The first move is searched here to get a bound for all the others
+        best_move = moves[0]
+        board.make_move(*best_move, AI if maximizing else HUMAN)
+        try:
+            best, _ = self.search_function(
+                board,
+                depth - 1,
+                alpha,
+                beta,
+                not maximizing,
+                self.tt,
+                deadline,
+                self.last_stats,
+                self.cancelled,
+            )
+        finally:
+            board.undo_move(*best_move)
+        if (best >= beta) if maximizing else (best <= alpha):
+            return best, best_move
+        with self.shared_bound.get_lock():
+            self.shared_bound.value = best
+
+        end = None
+        if deadline is not None:
+            end = time.time() + deadline - time.perf_counter()
+        config = (board.board.size, board.board.win_length)
+        black, white = board.board.black, board.board.white
+        futures = [
+            self.pool.submit(
+                _search_root_move,
+                config,
+                black,
+                white,
+                move,
+                depth,
+                alpha,
+                beta,
+                maximizing,
+                end,
+                self.last_stats is not None,
+            )
+            for move in moves[1:]
+        ]
+        try:
+            # Results are read in move order, so ties go to the earlier move
+            for move, future in zip(moves[1:], futures):
+                score, counters = self.worker_result(future)
+                if counters is not None:
+                    self.last_stats.merge(counters)
+                if score is SearchTimeout:
+                    raise SearchTimeout()
+                if score is not None and (
+                    score > best if maximizing else score < best
+                ):
+                    best, best_move = score, move
+        except SearchTimeout:
+            # Stop the root moves still being searched and let them unwind,
+            # so none of them is left running into the next search
+            self.worker_cancel.set()
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            self.worker_cancel.clear()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+        if alpha < best < beta:
+            self.tt.store(key, depth, best, EXACT, board.to_frame(frame, best_move))
+        return best, best_move
+
+    def worker_result(self, future):
+        # Waits for a root move's result, raising SearchTimeout once
+        # `cancelled` is set, which the worker processes cannot see
+        while True:
+            try:
+                return future.result(CANCEL_POLL)
+            except TimeoutError:
+                if self.cancelled.is_set():
+                    raise SearchTimeout()
+
+    def close(self):
+        if self.pool is not None:
+            # parallel_search leaves no task queued or running
+            self.pool.shutdown()
+            self.pool = None
+
+    def iterative_deepening(self, board, maximizing, deadline):
+        empty = board.board.size * board.board.size - board.board.stones
+        best_move, score = None, None
+        self.last_depth = 0
+        for depth in range(1, min(MAX_ITERATIVE_DEPTH, empty) + 1):
+            # Each iteration leaves its principal variation in the table,
+            # where the next, deeper iteration picks it up for move ordering
+            try:
+                if score is None:
+                    alpha, beta = -math.inf, math.inf
+                else:
+                    alpha, beta = score - ASPIRATION_WINDOW, score + ASPIRATION_WINDOW
+                result, move = self.search(
+                    board, depth, alpha, beta, maximizing, deadline
+                )
+                if result <= alpha or result >= beta:
+                    # Fell outside the aspiration window, redo with a full one
+                    result, move = self.search(
+                        board, depth, -math.inf, math.inf, maximizing, deadline
+                    )
+            except SearchTimeout:
+                break
+            best_move, score = move, result
+            self.last_depth, self.last_score = depth, score
+            if abs(score) >= 100000:
+                break
+        if best_move is None:
+            # Not even depth 1 finished, so play the stored or first candidate
+            key, frame = board.tt_key(maximizing)
+            entry = self.tt.lookup(key)
+            if entry:
+                best_move = board.from_frame(frame, entry[4])
+            else:
+                moves = board.get_nearby_moves()
+                best_move = moves[0] if moves else None
+        return best_move
+
     def make_move(self):
         move = self.get_move()
         if move:
@@ -430,47 +677,65 @@ def ai_vs_ai_minmax_alphabeta():
 
 
 class MinimaxAgent:
-    def __init__(self, engine, color, depth=1):
+    def __init__(
+        self,
+        engine,
+        color,
+        depth=1,
+        radius=2,
+        instrument=False,
+        book=True,
+        eval_cache=True,
+        rng=None,
+    ):
         self.engine = engine
         self.color = color
         self.opponent = "black" if color == "white" else "white"
         self.depth = depth
+        self.radius = radius
+        # Opt-in statistics, as for AlphaBetaAgent
+        self.instrument = instrument
+        self.last_stats = None
+        self.game_stats = GameStats()
+        # As for AlphaBetaAgent, makes minimax raise SearchTimeout when set
+        self.cancelled = threading.Event()
+        self.book = default_book() if book is True else book or None
+        # Leaf scores by position hash; True gives the agent its own cache
+        self.eval_cache = EvaluationCache() if eval_cache is True else eval_cache
+        # As for RandomAgent, used for the fallback move
+        self.rng = rng if rng is not None else random
+        # Threat score plus killer and history ordering, so alpha-beta cuts
+        # off early
+        self.ordering = MoveOrdering()
 
     def get_move(self):
-        # Check for immediate winning move
-        for row, col in self.engine.available_moves():
-            self.engine.board[row][col] = self.color
-            if self.engine.checkwin(self.color):
-                self.engine.board[row][col] = None
-                return (row, col)
-            self.engine.board[row][col] = None
-
-        # Check for blocking opponent's winning move
-        for row, col in self.engine.available_moves():
-            self.engine.board[row][col] = self.opponent
-            if self.engine.checkwin(self.opponent):
-                self.engine.board[row][col] = None
-                return (row, col)
-            self.engine.board[row][col] = None
+        if self.instrument:
+            self.last_stats = SearchStats(f"MinimaxAgent({self.color})")
+        move = self.choose_move()
+        if self.last_stats is not None:
+            self.last_stats.finish(self.depth, None, move)
+            self.game_stats.add(self.last_stats)
+            self.last_stats.log()
+        return move
+
+    def choose_move(self):
+        # Win at once, or block the opponent's five
+        move = immediate_move(self.engine.board, self.color)
+        if move is not None:
+            return move
+
+        if self.book is not None:
+            move = self.book.lookup(self.engine.board)
+            if move is not None:
+                return move
 
         # Count total pieces to handle early game moves
-        total_pieces = sum(
-            1
-            for row in range(self.engine.BOARD_SIZE)
-            for col in range(self.engine.BOARD_SIZE)
-            if self.engine.board[row][col] is not None
-        )
+        board = self.engine.board
+        total_pieces = board.stones
 
         # Special case for when there's only one piece on the board
         if total_pieces == 1:
-            for r in range(self.engine.BOARD_SIZE):
-                for c in range(self.engine.BOARD_SIZE):
-                    if self.engine.board[r][c] == self.opponent:
-                        opp_row, opp_col = r, c
-                        break
-                else:
-                    continue
-                break
+            opp_row, opp_col = board.cells(board.bits(self.opponent))[0]
 
             # Try to place near opponent
             neighbors = [
@@ -485,114 +750,145 @@ class MinimaxAgent:
             ]
 
             for row, col in neighbors:
-                if (
-                    0 <= row < self.engine.BOARD_SIZE
-                    and 0 <= col < self.engine.BOARD_SIZE
-                    and self.engine.board[row][col] is None
-                ):
+                if board.in_bounds(row, col) and board.is_empty(row, col):
                     return (row, col)
 
         # Special case for early game (3 pieces)
         elif total_pieces == 3:
-            for r in range(self.engine.BOARD_SIZE):
-                for c in range(self.engine.BOARD_SIZE):
-                    if self.engine.board[r][c] == self.color:
-                        neighbors = [
-                            (r + 1, c),
-                            (r - 1, c),
-                            (r, c + 1),
-                            (r, c - 1),
-                        ]
-                        for row, col in neighbors:
-                            if (
-                                0 <= row < self.engine.BOARD_SIZE
-                                and 0 <= col < self.engine.BOARD_SIZE
-                                and self.engine.board[row][col] is None
-                            ):
-                                return (row, col)
+            for r, c in board.cells(board.bits(self.color)):
+                neighbors = [
+                    (r + 1, c),
+                    (r - 1, c),
+                    (r, c + 1),
+                    (r, c - 1),
+                ]
+                for row, col in neighbors:
+                    if board.in_bounds(row, col) and board.is_empty(row, col):
+                        return (row, col)
 
         # Use minimax for more complex positions
-        else:
-            score, move = self.minimax(self.depth, True)
+        self.ordering.new_search()
+        score, move = self.minimax(self.depth, True)
+        if move is None:
+            # Fallback to random move if no good move found
+            move = self.rng.choice(self.engine.available_moves())
         return move
 
-        # Fallback to random move if no good move found
-        return random.choice(self.engine.available_moves())
+    def candidate_moves(self, depth=None):
+        # Only empty cells within `radius` of a stone are worth searching,
+        # the most threatening first
+        board = self.engine.board
+        moves = board.cells(board.neighbourhood(self.radius))
+        if not moves and not board.stones:
+            moves = [(board.size // 2, board.size // 2)]
+        return self.ordering.order(board, moves, depth)
+
+    def minimax(
+        self, depth, is_maximizing, last_move=None, alpha=-math.inf, beta=math.inf
+    ):
+        # Alpha-beta pruned, so scores are those of plain minimax whenever
+        # they fall inside (alpha, beta)
+        if self.cancelled.is_set():
+            raise SearchTimeout()
+        stats = self.last_stats
+        if stats is not None:
+            stats.nodes += 1
 
-    def minimax(self, depth, is_maximizing):
         # Terminal conditions
         if depth == 0:
-            return self.evaluate(self.engine.board, self.color), None
-
-        for color in [self.color, self.opponent]:
-            for row in range(self.engine.BOARD_SIZE):
-                for col in range(self.engine.BOARD_SIZE):
-                    if self.engine.board[row][col] == color:
-                        if self.engine.checkwin(color):
-                            if color == self.color:
-                                return 1000000, None
-                            else:
-                                return -1000000, None
+            if stats is None:
+                return self.evaluate(self.engine.board, self.color), None
+            started = time.perf_counter()
+            score = self.evaluate(self.engine.board, self.color)
+            stats.eval_time += time.perf_counter() - started
+            stats.leaves += 1
+            return score, None
+
+        # Only the side that just moved can have completed a five
+        if last_move is not None:
+            mover = self.opponent if is_maximizing else self.color
+            if self.engine.checkwin_at(last_move[0], last_move[1], mover):
+                if stats is not None:
+                    stats.leaves += 1
+                if mover == self.color:
+                    return 1000000, None
+                else:
+                    return -1000000, None
 
         best_score = -float("inf") if is_maximizing else float("inf")
         best_move = None
 
-        for row, col in self.engine.available_moves():
-            # Make the move
-            self.engine.board[row][col] = self.color if is_maximizing else self.opponent
+        if stats is None:
+            moves = self.candidate_moves(depth)
+        else:
+            started = time.perf_counter()
+            moves = self.candidate_moves(depth)
+            stats.movegen_time += time.perf_counter() - started
+            stats.expanded += 1
+        if not moves:
+            # Full board
+            return self.evaluate(self.engine.board, self.color), None
 
-            # Recursive call
-            score, _ = self.minimax(depth - 1, not is_maximizing)
+        for i, (row, col) in enumerate(moves):
+            # Make the move
+            self.engine.board.place(
+                row, col, self.color if is_maximizing else self.opponent
+            )
 
-            # Undo the move
-            self.engine.board[row][col] = None
+            try:
+                # Recursive call
+                score, _ = self.minimax(
+                    depth - 1, not is_maximizing, (row, col), alpha, beta
+                )
+            finally:
+                # Undo the move
+                self.engine.board.remove(row, col)
 
             # Update best score
             if is_maximizing:
                 if score > best_score:
                     best_score = score
                     best_move = (row, col)
+                alpha = max(alpha, score)
             else:
                 if score < best_score:
                     best_score = score
                     best_move = (row, col)
+                beta = min(beta, score)
+            if beta <= alpha:
+                self.ordering.record_cutoff((row, col), depth)
+                break
+        if stats is not None:
+            stats.children += i + 1
+            if beta <= alpha:
+                stats.cutoffs += 1
+                stats.first_move_cutoffs += i == 0
 
         return best_score, best_move
 
     def evaluate(self, board, player):
+        # Cached from black's side, so agents of both colours can share a cache
+        if self.eval_cache is None:
+            score = self.score_black(board)
+        else:
+            score = self.eval_cache.get(board.hash)
+            if score is None:
+                score = self.score_black(board)
+                self.eval_cache.put(board.hash, score)
+        return score if self.color == BLACK else -score
+
+    def score_black(self, board):
+        # Runs of 2, 3 and 4 stones for both sides in one pass per colour, or
+        # of one, two and three stones short of a win for other win lengths
         score = 0
-        score += self.count(board, self.color, 4) * 10000
-        score += self.count(board, self.color, 3) * 1000
-        score += self.count(board, self.color, 2) * 100
-        score -= self.count(board, self.opponent, 4) * 10000
-        score -= self.count(board, self.opponent, 3) * 1000
-        score -= self.count(board, self.opponent, 2) * 100
+        longest = board.win_length - 1
+        for color, sign in ((BLACK, 1), (WHITE, -1)):
+            *_, twos, threes, fours = board.run_counts(color, longest)
+            score += sign * (fours * 10000 + threes * 1000 + twos * 100)
         return score
 
     def count(self, board, color, length):
-        count = 0
-        for row in range(self.engine.BOARD_SIZE):
-            for col in range(self.engine.BOARD_SIZE):
-                # Horizontal
-                if col + length - 1 < self.engine.BOARD_SIZE:
-                    if all(board[row][col + i] == color for i in range(length)):
-                        count += 1
-                # Vertical
-                if row + length - 1 < self.engine.BOARD_SIZE:
-                    if all(board[row + i][col] == color for i in range(length)):
-                        count += 1
-                # Diagonal down-right
-                if (
-                    row + length - 1 < self.engine.BOARD_SIZE
-                    and col + length - 1 < self.engine.BOARD_SIZE
-                ):
-                    if all(board[row + i][col + i] == color for i in range(length)):
-                        count += 1
-                # Diagonal down-left
-                if row + length - 1 < self.engine.BOARD_SIZE and col - length + 1 >= 0:
-                    if all(board[row + i][col - i] == color for i in range(length)):
-                        count += 1
-        return count
+        return board.count_runs(color, length)
 
     def make_move(self):
         move = self.get_move()
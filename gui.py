@@ -2,16 +2,27 @@
 import tkinter as tk
 from tkinter import messagebox
 from game import GameEngine, RandomAgent, MinimaxAgent, AlphaBetaAgent
+from background import BackgroundSearch
 import time
 import random
 
+# How often a running AI search is checked on, in milliseconds
+POLL_MS = 50
+
 # --- GUI Setup ---
 window = tk.Tk()
 window.title("Gomoku Game")
 
-# Player indicator label
-player_indicator = tk.Label(window, text="", font=("Arial", 14))
-player_indicator.pack(pady=10)
+# Player indicator label, with the AI's "thinking..." status next to it
+status_frame = tk.Frame(window)
+status_frame.pack(pady=10)
+player_indicator = tk.Label(status_frame, text="", font=("Arial", 14))
+player_indicator.pack(side=tk.LEFT)
+thinking_label = tk.Label(status_frame, text="", font=("Arial", 11), fg="#555555")
+thinking_label.pack(side=tk.LEFT, padx=10)
+
+# AI moves are searched on a worker thread so the window never freezes
+search = BackgroundSearch()
 
 # Center the window on the screen
 screen_width = window.winfo_screenwidth()
@@ -38,36 +49,61 @@ for i in range(BOARD_SIZE):
     canvas.create_line(CELL_SIZE // 2, y, WINDOW_SIZE - CELL_SIZE // 2, y)
 
 
+# Mark the stone played last with a small dot
+HIGHLIGHT_LAST_MOVE = True
+
+# Canvas item of every stone on screen by cell, and the stones they show
+piece_items = {}
+drawn = {"black": 0, "white": 0}
+last_move_marker = canvas.create_oval(0, 0, 0, 0, fill="red", state="hidden")
+
+
 def draw_piece(row, col, color):
     center_x = col * CELL_SIZE + CELL_SIZE // 2
     center_y = row * CELL_SIZE + CELL_SIZE // 2
     radius = 17
-    canvas.create_oval(
+    return canvas.create_oval(
         center_x - radius,
         center_y - radius,
         center_x + radius,
         center_y + radius,
         fill=color,
+        tags="piece",
     )
 
 
 def update_board():
-    canvas.delete("piece")
-    for row in range(BOARD_SIZE):
-        for col in range(BOARD_SIZE):
-            color = engine.board[row][col]
-            if color:
-                center_x = col * CELL_SIZE + CELL_SIZE // 2
-                center_y = row * CELL_SIZE + CELL_SIZE // 2
-                radius = 17
-                canvas.create_oval(
-                    center_x - radius,
-                    center_y - radius,
-                    center_x + radius,
-                    center_y + radius,
-                    fill=color,
-                    tags="piece",
-                )
+    # Only the cells whose stone changed since the last call are redrawn, so
+    # a move costs one new item and a reset deletes just the stones shown
+    board = engine.board
+    for color in ("black", "white"):
+        for cell in board.cells(drawn[color] & ~board.bits(color)):
+            canvas.delete(piece_items.pop(cell))
+    for color in ("black", "white"):
+        bits = board.bits(color)
+        for cell in board.cells(bits & ~drawn[color]):
+            piece_items[cell] = draw_piece(*cell, color)
+        drawn[color] = bits
+    if HIGHLIGHT_LAST_MOVE and engine.last_move is not None:
+        row, col = engine.last_move
+        center_x = col * CELL_SIZE + CELL_SIZE // 2
+        center_y = row * CELL_SIZE + CELL_SIZE // 2
+        canvas.coords(
+            last_move_marker, center_x - 4, center_y - 4, center_x + 4, center_y + 4
+        )
+        canvas.itemconfigure(last_move_marker, state="normal")
+        canvas.tag_raise(last_move_marker)
+    else:
+        canvas.itemconfigure(last_move_marker, state="hidden")
+
+
+def replay(moves):
+    # Plays a whole move list and draws the result once instead of per move
+    engine.reset()
+    for row, col in moves:
+        if not engine.play_move(row, col):
+            break
+    update_board()
 
 
 def handle_click(event):
@@ -105,9 +141,45 @@ def handle_click_user_vs_ai(event):
         canvas.after(500, ai_agent_move)
 
 
+def run_ai(agent, on_move):
+    # Searches in the background and hands the move to on_move on the Tk
+    # thread, showing the nodes searched so far in the meantime
+    future = search.start(agent)
+    thinking_label.config(text="Thinking...")
+
+    def poll():
+        if future is not search.future:
+            # Cancelled by a reset
+            return
+        if not future.done():
+            nodes = search.nodes()
+            if nodes:
+                thinking_label.config(text=f"Thinking... {nodes:,} nodes")
+            window.after(POLL_MS, poll)
+            return
+        thinking_label.config(text="")
+        on_move(future.result())
+
+    window.after(POLL_MS, poll)
+
+
+def cancel_ai():
+    search.cancel()
+    thinking_label.config(text="")
+
+
+def close_window():
+    search.shutdown()
+    window.destroy()
+
+
 def ai_agent_move():
     if engine.get_current_player() == "white" and not engine.is_game_over():
-        move = ai_agent.get_move()
+        run_ai(ai_agent, play_ai_move)
+
+
+def play_ai_move(move):
+    if engine.get_current_player() == "white" and not engine.is_game_over():
         if move:
             row, col = move
             engine.play_move(row, col)
@@ -144,6 +216,7 @@ def set_player_indicator(mode, ai_strategy=None):
 def start_user_vs_ai(strategy, ai_strategy_window):
     ai_strategy_window.destroy()
     global ai_agent
+    cancel_ai()
     engine.reset()
     update_board()
     canvas.bind("<Button-1>", handle_click_user_vs_ai)
@@ -151,17 +224,18 @@ def start_user_vs_ai(strategy, ai_strategy_window):
     if strategy == "Random":
         ai_agent = RandomAgent(engine, "white")
     elif strategy == "Minimax":
-        ai_agent = MinimaxAgent(engine, "white")
+        ai_agent = MinimaxAgent(engine, "white", instrument=True)
     elif strategy == "Alpha-Beta Pruning":
-        ai_agent = AlphaBetaAgent(engine, "white")
+        ai_agent = AlphaBetaAgent(engine, "white", instrument=True)
     window.deiconify()
 
 
 def ai_vs_ai_minmax_alphabeta_gui():
+    cancel_ai()
     engine.reset()
     update_board()
-    black_agent = MinimaxAgent(engine, "black")
-    white_agent = AlphaBetaAgent(engine, "white")
+    black_agent = MinimaxAgent(engine, "black", instrument=True)
+    white_agent = AlphaBetaAgent(engine, "white", instrument=True)
     move_num = 1
 
     # Make first move random in the center region of the board
@@ -174,7 +248,6 @@ def ai_vs_ai_minmax_alphabeta_gui():
     move_num += 1
 
     def play_next():
-        nonlocal move_num
         if engine.is_game_over():
             winner = engine.get_winner()
             if winner:
@@ -183,15 +256,15 @@ def ai_vs_ai_minmax_alphabeta_gui():
                 messagebox.showinfo("Game Over", "Draw!")
             return
         if engine.get_current_player() == "black":
-            move = black_agent.get_move()
-            if move:
-                row, col = move
-                engine.play_move(row, col)
+            run_ai(black_agent, play)
         else:
-            move = white_agent.get_move()
-            if move:
-                row, col = move
-                engine.play_move(row, col)
+            run_ai(white_agent, play)
+
+    def play(move):
+        nonlocal move_num
+        if move:
+            row, col = move
+            engine.play_move(row, col)
         update_board()
         engine.printboard()
         move_num += 1
@@ -202,6 +275,7 @@ def ai_vs_ai_minmax_alphabeta_gui():
 
 def start_game(mode):
     welcome_window.destroy()
+    cancel_ai()
     engine.reset()
     update_board()
     if mode == "User vs AI":
@@ -267,5 +341,6 @@ ai_vs_ai_button = tk.Button(
 )
 ai_vs_ai_button.pack(pady=5)
 window.withdraw()
+window.protocol("WM_DELETE_WINDOW", close_window)
 
 window.mainloop()
@@ -0,0 +1,118 @@
+# Index tables shared by every scan over the board, built once per board
+# size (and win length) so hot loops only look indices up. Indices are
+# padded board indices, row * (size + 1) + col, as used by board.Board.
+
+# horizontal, vertical, diagonal, anti-diagonal
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+_board_lines = {}
+_window_tables = {}
+_cell_masks = {}
+_ray_tables = {}
+_neighbour_tables = {}
+
+
+def board_lines(size):
+    # Every full row, column, diagonal and anti-diagonal as (direction,
+    # indices), each line read in its direction
+    lines = _board_lines.get(size)
+    if lines is None:
+        stride = size + 1
+        lines = []
+        for direction, (dr, dc) in enumerate(DIRECTIONS):
+            for row in range(size):
+                for col in range(size):
+                    # Lines start at the first cell inside the board
+                    if 0 <= row - dr < size and 0 <= col - dc < size:
+                        continue
+                    cells = []
+                    r, c = row, col
+                    while 0 <= r < size and 0 <= c < size:
+                        cells.append(r * stride + c)
+                        r, c = r + dr, c + dc
+                    lines.append((direction, tuple(cells)))
+        _board_lines[size] = lines
+    return lines
+
+
+def window_table(size, win_length):
+    # Every run of `win_length` cells in the four directions as a tuple of
+    # padded indices and as a bitmask, plus the windows covering each cell.
+    # Windows are ordered by first cell, then direction.
+    config = (size, win_length)
+    table = _window_tables.get(config)
+    if table is None:
+        windows = sorted(
+            (cells[i], direction, cells[i : i + win_length])
+            for direction, cells in board_lines(size)
+            for i in range(len(cells) - win_length + 1)
+        )
+        windows = [cells for _, _, cells in windows]
+        masks = [sum(1 << cell for cell in cells) for cells in windows]
+        cell_windows = [[] for _ in range(size * (size + 1))]
+        for window, cells in enumerate(windows):
+            for cell in cells:
+                cell_windows[cell].append(window)
+        table = _window_tables[config] = (windows, masks, cell_windows)
+    return table
+
+
+def cell_masks(size, win_length):
+    # For each cell, per direction, the mask of its two neighbours in that
+    # direction and the masks of the windows through it. A win through a
+    # cell needs a neighbour of the same colour, so the windows of most
+    # directions are never looked at.
+    config = (size, win_length)
+    table = _cell_masks.get(config)
+    if table is None:
+        cells = size * (size + 1)
+        windows = [[[] for _ in DIRECTIONS] for _ in range(cells)]
+        for direction, line in board_lines(size):
+            for i in range(len(line) - win_length + 1):
+                mask = sum(1 << cell for cell in line[i : i + win_length])
+                for cell in line[i : i + win_length]:
+                    windows[cell][direction].append(mask)
+        table = [()] * cells
+        for cell, rays in enumerate(ray_table(size, 1)):
+            table[cell] = tuple(
+                (sum(1 << i for i in ahead + behind), tuple(windows[cell][direction]))
+                for direction, (ahead, behind) in enumerate(rays)
+            )
+        _cell_masks[config] = table
+    return table
+
+
+def ray_table(size, length):
+    # For each cell, per direction, the indices of up to `length` cells
+    # ahead and behind it, nearest first and cut off at the edge
+    config = (size, length)
+    table = _ray_tables.get(config)
+    if table is None:
+        rays = [[None] * len(DIRECTIONS) for _ in range(size * (size + 1))]
+        for direction, cells in board_lines(size):
+            for pos, cell in enumerate(cells):
+                ahead = cells[pos + 1 : pos + 1 + length]
+                behind = cells[max(pos - length, 0) : pos][::-1]
+                rays[cell][direction] = (ahead, behind)
+        table = _ray_tables[config] = [
+            tuple(cell) if cell[0] is not None else () for cell in rays
+        ]
+    return table
+
+
+def neighbour_table(size, radius):
+    # Padded indices of every cell within `radius` (Chebyshev) of each cell
+    table = _neighbour_tables.get((size, radius))
+    if table is None:
+        stride = size + 1
+        table = [()] * (size * stride)
+        for row in range(size):
+            for col in range(size):
+                table[row * stride + col] = tuple(
+                    (row + dr) * stride + col + dc
+                    for dr in range(-radius, radius + 1)
+                    for dc in range(-radius, radius + 1)
+                    if (dr or dc) and 0 <= row + dr < size and 0 <= col + dc < size
+                )
+        _neighbour_tables[(size, radius)] = table
+    return table
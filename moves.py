@@ -0,0 +1,121 @@
+# Candidate generation and move ordering for the alpha-beta search
+from lines import neighbour_table
+
+# Ordering score for a run of 0..4 stones next to a candidate cell, with
+# five in a row to win
+RUN_SCORES = (0, 10, 100, 1000, 10000)
+# Killers go ahead of quiet moves but behind anything making or stopping a three
+KILLER_BONUS = 900
+
+_run_scores = {len(RUN_SCORES): RUN_SCORES}
+
+
+def run_scores(win_length):
+    # RUN_SCORES for another win length, aligned on the longest run so a run
+    # one stone short of a win always scores the most
+    scores = _run_scores.get(win_length)
+    if scores is None:
+        shift = len(RUN_SCORES) - win_length
+        scores = _run_scores[win_length] = (0,) + tuple(
+            RUN_SCORES[max(1, run + shift)] for run in range(1, win_length)
+        )
+    return scores
+
+
+def threat_score(board, index):
+    # Sum over both colours and all four directions of the run of stones the
+    # move would join or block
+    scores = run_scores(board.win_length)
+    longest = board.win_length - 1
+    score = 0
+    for bits in (board.black, board.white):
+        for shift in board.shifts:
+            run = 0
+            i = index + shift
+            while run < longest and bits >> i & 1:
+                run += 1
+                i += shift
+            i = index - shift
+            while run < longest and i >= 0 and bits >> i & 1:
+                run += 1
+                i -= shift
+            score += scores[run]
+    return score
+
+
+class CandidateTracker:
+    def __init__(self, board, radius=2):
+        self.board = board
+        self.radius = radius
+        self.neighbours = neighbour_table(board.size, radius)
+        # near[i] is the number of stones within radius of cell i
+        self.near = [0] * (board.size * board.stride)
+        self.cells = 0
+        occupied = board.black | board.white
+        for row, col in board.cells(occupied):
+            for n in self.neighbours[row * board.stride + col]:
+                self.near[n] += 1
+                self.cells |= 1 << n
+        self.cells &= ~occupied
+        board.attach(self)
+
+    def close(self):
+        self.board.detach(self)
+
+    def on_place(self, row, col, color):
+        near = self.near
+        bits = 0
+        for n in self.neighbours[row * self.board.stride + col]:
+            near[n] += 1
+            bits |= 1 << n
+        self.cells = (self.cells | bits) & ~(self.board.black | self.board.white)
+
+    def on_remove(self, row, col, color):
+        index = row * self.board.stride + col
+        near = self.near
+        for n in self.neighbours[index]:
+            near[n] -= 1
+            if not near[n]:
+                self.cells &= ~(1 << n)
+        if near[index]:
+            self.cells |= 1 << index
+
+
+class MoveOrdering:
+    def __init__(self, beam_width=None):
+        # Keep only the best `beam_width` candidates at every node
+        self.beam_width = beam_width
+        self.killers = {}
+        self.history = {}
+
+    def new_search(self):
+        self.killers = {}
+        for move in self.history:
+            self.history[move] //= 2
+
+    def order(self, board, moves, depth=None, tt_move=None):
+        killers = self.killers.get(depth, ())
+        history = self.history
+        stride = board.stride
+        scored = []
+        for move in moves:
+            score = threat_score(board, move[0] * stride + move[1])
+            score += history.get(move, 0)
+            if move in killers:
+                score += KILLER_BONUS
+            scored.append((score, move))
+        scored.sort(reverse=True)
+        ordered = [move for _, move in scored]
+        if tt_move is not None and tt_move in ordered:
+            ordered.remove(tt_move)
+            ordered.insert(0, tt_move)
+        if self.beam_width:
+            del ordered[self.beam_width :]
+        return ordered
+
+    def record_cutoff(self, move, depth):
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
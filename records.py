@@ -0,0 +1,161 @@
+# Game records: move lists with the board size and winner, stored one game
+# per line as text ("15 black h8 i9 h9 ...") or in a compact binary form,
+# plus Piskvork's PSQ format for single games. Readers are generators and
+# writers take any iterable, so files of millions of games are streamed.
+import struct
+
+from game import GameEngine
+
+BINARY_MAGIC = b"GMKR\x01"
+# board size, winner (0 none, 1 black, 2 white), number of moves
+BINARY_HEADER = struct.Struct("<BBH")
+WINNERS = (None, "black", "white")
+COLUMNS = "abcdefghijklmnopqrstuvwxyz"
+
+
+class GameRecord:
+    def __init__(self, moves, size=15, winner=None):
+        self.moves = [tuple(move) for move in moves]
+        self.size = size
+        self.winner = winner
+
+    @classmethod
+    def from_engine(cls, engine):
+        return cls(engine.moves, engine.BOARD_SIZE, engine.winner)
+
+    def __eq__(self, other):
+        return (
+            self.moves == other.moves
+            and self.size == other.size
+            and self.winner == other.winner
+        )
+
+    def __repr__(self):
+        return f"GameRecord({self.to_line()!r})"
+
+    def to_line(self):
+        moves = " ".join(to_notation(move, self.size) for move in self.moves)
+        return f"{self.size} {self.winner or '-'} {moves}".rstrip()
+
+    @classmethod
+    def from_line(cls, line):
+        size, winner, *moves = line.split()
+        size = int(size)
+        moves = [from_notation(move, size) for move in moves]
+        return cls(moves, size, None if winner == "-" else winner)
+
+
+def to_notation(move, size=15):
+    # Columns are letters from the left, rows numbers from the bottom: the
+    # centre of a 15x15 board is h8
+    row, col = move
+    return f"{COLUMNS[col]}{size - row}"
+
+
+def from_notation(text, size=15):
+    col = COLUMNS.index(text[0].lower())
+    row = size - int(text[1:])
+    if not (0 <= row < size and 0 <= col < size):
+        raise ValueError(f"{text} is off a {size}x{size} board")
+    return row, col
+
+
+def replay(record, engine=None):
+    # Plays the record into `engine` (a new one by default) and returns it
+    if engine is None:
+        engine = GameEngine(record.size)
+    else:
+        engine.reset()
+    for row, col in record.moves:
+        if not engine.play_move(row, col):
+            move = to_notation((row, col), record.size)
+            raise ValueError(f"Illegal move {move}")
+    return engine
+
+
+def write_text(file, records):
+    for record in records:
+        file.write(record.to_line() + "\n")
+
+
+def read_text(file):
+    for line in file:
+        if line.strip() and not line.startswith("#"):
+            yield GameRecord.from_line(line)
+
+
+def write_binary(file, records):
+    # One byte per move on boards of up to 16x16, two bytes above that
+    file.write(BINARY_MAGIC)
+    for record in records:
+        size = record.size
+        winner = WINNERS.index(record.winner)
+        file.write(BINARY_HEADER.pack(size, winner, len(record.moves)))
+        cells = [row * size + col for row, col in record.moves]
+        file.write(struct.pack(f"<{len(cells)}{_cell_format(size)}", *cells))
+
+
+def read_binary(file):
+    if file.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+        raise ValueError("Not a binary game record file")
+    while True:
+        header = file.read(BINARY_HEADER.size)
+        if not header:
+            return
+        size, winner, count = BINARY_HEADER.unpack(header)
+        cell = struct.Struct(f"<{count}{_cell_format(size)}")
+        cells = cell.unpack(file.read(cell.size))
+        moves = [divmod(index, size) for index in cells]
+        yield GameRecord(moves, size, WINNERS[winner])
+
+
+def _cell_format(size):
+    return "B" if size * size <= 256 else "H"
+
+
+def write_psq(file, record):
+    # Piskvork's format: a header line, then one "x,y,time" line per move
+    # with 1-based coordinates, x being the column
+    file.write(f"Piskvorky {record.size}x{record.size}, 11:11, 0\n")
+    for row, col in record.moves:
+        file.write(f"{col + 1},{row + 1},0\n")
+    file.write("-1\n")
+
+
+def read_psq(file):
+    header = file.readline()
+    size = int(header.split()[1].split("x")[0])
+    moves = []
+    for line in file:
+        # The moves end at the first line that is not "x,y,time"
+        fields = line.strip().split(",")
+        try:
+            x, y = int(fields[0]), int(fields[1])
+        except (ValueError, IndexError):
+            break
+        if x < 1 or y < 1:
+            break
+        moves.append((y - 1, x - 1))
+    record = GameRecord(moves, size)
+    # PSQ files do not store the result, so it comes from replaying
+    record.winner = replay(record).winner
+    return record
+
+
+def save(path, records):
+    # Binary for ".gmr" files, text otherwise
+    if path.endswith(".gmr"):
+        with open(path, "wb") as f:
+            write_binary(f, records)
+    else:
+        with open(path, "w") as f:
+            write_text(f, records)
+
+
+def load(path):
+    if path.endswith(".gmr"):
+        with open(path, "rb") as f:
+            yield from read_binary(f)
+    else:
+        with open(path) as f:
+            yield from read_text(f)
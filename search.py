@@ -0,0 +1,426 @@
+# The search core shared by game.py, alpha_beta.py and the GUI: the Gomoku
+# search board and the alpha-beta search. The evaluator and the move
+# generator are board trackers that Gomoku attaches, and agents take the
+# search function, so each of them can be swapped.
+import math
+import time
+
+from board import Board, BLACK, WHITE, WIN_LENGTH
+from evaluator import PatternEvaluator
+from moves import CandidateTracker, MoveOrdering
+from symmetry import CanonicalHash, from_canonical, to_canonical
+from zobrist import SIDE_KEY, EXACT, LOWER, UPPER
+
+# Alpha Beta constants
+EMPTY = "."
+HUMAN = BLACK
+AI = WHITE
+# Size of the board Gomoku() creates when given none; every search follows
+# the size and win length of the board it is given
+BOARD_SIZE = 15
+MAX_DEPTH = 2
+# Late move reductions in pvs: from this depth on, moves ranked after the
+# first LMR_MOVES are searched one ply shallower first
+LMR_DEPTH = 3
+LMR_MOVES = 3
+
+
+class Gomoku:
+    def __init__(
+        self,
+        board=None,
+        ordering=None,
+        symmetric=False,
+        eval_cache=None,
+        evaluator=PatternEvaluator,
+        movegen=CandidateTracker,
+    ):
+        # The board is searched in place, so it can be the engine's own
+        # board; close() detaches everything attached to it here
+        self.board = board if board is not None else Board(BOARD_SIZE)
+        # With symmetric=True all 8 images of a position share their
+        # transposition table entries, which is only sound for an evaluator
+        # scoring them all alike
+        if symmetric and not getattr(evaluator, "symmetric", False):
+            raise ValueError(
+                f"symmetric=True needs a symmetric evaluator, not {evaluator.__name__}"
+            )
+        # Keeps per-line pattern scores up to date on make_move/undo_move.
+        # Any tracker class with score(color) and close() will do.
+        self.evaluator = evaluator(self.board)
+        # Empty cells near a stone, also kept up to date on make_move/undo_move.
+        # Any tracker class with `cells`, `radius` and close() will do.
+        self.candidates = movegen(self.board)
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.symmetry = CanonicalHash(self.board) if symmetric else None
+        # Optional EvaluationCache, which every Gomoku with the same
+        # evaluator can share
+        self.eval_cache = eval_cache
+
+    def close(self):
+        self.evaluator.close()
+        self.candidates.close()
+        if self.symmetry is not None:
+            self.symmetry.close()
+
+    def symbol_rows(self):
+        symbols = {None: EMPTY, HUMAN: "X", AI: "O"}
+        return [
+            [symbols[self.board.get(x, y)] for y in range(self.board.size)]
+            for x in range(self.board.size)
+        ]
+
+    def print_board(self):
+        print("  " + " ".join(f"{i:2}" for i in range(self.board.size)))
+        for i, row in enumerate(self.symbol_rows()):
+            print(f"{i:2} " + "  ".join(row))
+
+    def is_valid_move(self, x, y):
+        return self.board.in_bounds(x, y) and self.board.is_empty(x, y)
+
+    def make_move(self, x, y, player):
+        if self.is_valid_move(x, y):
+            self.board.place(x, y, player)
+            return True
+        return False
+
+    def undo_move(self, x, y):
+        self.board.remove(x, y)
+
+    def check_win(self, player):
+        return self.board.has_five(player)
+
+    def check_win_at(self, x, y, player):
+        return self.board.has_five_at(x, y, player)
+
+    def get_nearby_moves(self, radius=2, depth=None, tt_move=None):
+        if radius == self.candidates.radius:
+            nearby = self.board.cells(self.candidates.cells)
+        else:
+            nearby = self.board.cells(self.board.neighbourhood(radius))
+        if not nearby:
+            # Only an empty board starts in the centre; a full one has no moves
+            if self.board.stones:
+                return []
+            return [(self.board.size // 2, self.board.size // 2)]
+        return self.ordering.order(self.board, nearby, depth, tt_move)
+
+    def tt_key(self, maximizing):
+        # (key, frame): the table key of the position with the side to move,
+        # and the transform into the frame that stored moves are kept in
+        if self.symmetry is None:
+            key, frame = self.board.hash, 0
+        else:
+            key, frame = self.symmetry.canonical()
+        return key ^ (SIDE_KEY if maximizing else 0), frame
+
+    def to_frame(self, frame, move):
+        return to_canonical(frame, move, self.board.size) if frame else move
+
+    def from_frame(self, frame, move):
+        return from_canonical(frame, move, self.board.size) if frame else move
+
+    def evaluate(self):
+        if self.eval_cache is None:
+            return self.evaluate_player(AI) - self.evaluate_player(HUMAN)
+        score = self.eval_cache.get(self.board.hash)
+        if score is None:
+            score = self.evaluate_player(AI) - self.evaluate_player(HUMAN)
+            self.eval_cache.put(self.board.hash, score)
+        return score
+
+    def evaluate_player(self, player):
+        return self.evaluator.score(player)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def alpha_beta(
+    board,
+    depth,
+    alpha,
+    beta,
+    maximizing,
+    tt=None,
+    deadline=None,
+    stats=None,
+    cancel=None,
+):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    # Set from another thread to abandon the search
+    if cancel is not None and cancel.is_set():
+        raise SearchTimeout()
+    if stats is not None:
+        stats.nodes += 1
+
+    key = None
+    tt_move = None
+    if tt is not None:
+        key, frame = board.tt_key(maximizing)
+        entry = tt.lookup(key)
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            _, entry_depth, entry_score, flag, tt_move, _ = entry
+            tt_move = board.from_frame(frame, tt_move)
+            if entry_depth >= depth and (
+                flag == EXACT
+                or (flag == LOWER and entry_score >= beta)
+                or (flag == UPPER and entry_score <= alpha)
+            ):
+                return entry_score, tt_move
+
+    if stats is None:
+        score = board.evaluate()
+    else:
+        started = time.perf_counter()
+        score = board.evaluate()
+        stats.eval_time += time.perf_counter() - started
+    if abs(score) >= 100000 or depth == 0:
+        if stats is not None:
+            stats.leaves += 1
+        return score, None
+
+    best_move = None
+    # The move that was best last time this position was seen goes first
+    if stats is None:
+        moves = board.get_nearby_moves(depth=depth, tt_move=tt_move)
+    else:
+        started = time.perf_counter()
+        moves = board.get_nearby_moves(depth=depth, tt_move=tt_move)
+        stats.movegen_time += time.perf_counter() - started
+    if not moves:
+        # A full board is scored like a leaf
+        if stats is not None:
+            stats.leaves += 1
+        return score, None
+    if stats is not None:
+        stats.expanded += 1
+    alpha_orig, beta_orig = alpha, beta
+
+    if maximizing:
+        best_eval = -math.inf
+        for i, move in enumerate(moves):
+            if not board.make_move(*move, AI):
+                # Nothing was placed, so there is nothing to undo
+                continue
+            try:
+                eval, _ = alpha_beta(
+                    board, depth - 1, alpha, beta, False, tt, deadline, stats, cancel
+                )
+            finally:
+                # Leave the board intact when a timeout unwinds the search
+                board.undo_move(*move)
+            if eval > best_eval:
+                best_eval = eval
+                best_move = move
+            alpha = max(alpha, eval)
+            if beta <= alpha:
+                board.ordering.record_cutoff(move, depth)
+                break
+    else:
+        best_eval = math.inf
+        for i, move in enumerate(moves):
+            if not board.make_move(*move, HUMAN):
+                # Nothing was placed, so there is nothing to undo
+                continue
+            try:
+                eval, _ = alpha_beta(
+                    board, depth - 1, alpha, beta, True, tt, deadline, stats, cancel
+                )
+            finally:
+                # Leave the board intact when a timeout unwinds the search
+                board.undo_move(*move)
+            if eval < best_eval:
+                best_eval = eval
+                best_move = move
+            beta = min(beta, eval)
+            if beta <= alpha:
+                board.ordering.record_cutoff(move, depth)
+                break
+    if stats is not None:
+        stats.children += i + 1
+        if beta <= alpha:
+            stats.cutoffs += 1
+            stats.first_move_cutoffs += i == 0
+
+    if tt is not None:
+        if best_eval <= alpha_orig:
+            flag = UPPER
+        elif best_eval >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, depth, best_eval, flag, board.to_frame(frame, best_move))
+    return best_eval, best_move
+
+
+def pvs(
+    board,
+    depth,
+    alpha,
+    beta,
+    maximizing,
+    tt=None,
+    deadline=None,
+    stats=None,
+    cancel=None,
+    reductions=False,
+):
+    # Principal variation search with the interface and scores of
+    # alpha_beta, so agents can take either. The first move is searched
+    # with the full window and the others with a null window, searching
+    # again only when one fails high. With reductions=True late moves are
+    # first searched one ply shallower (see LMR_DEPTH and LMR_MOVES).
+    if maximizing:
+        return _pvs(
+            board, depth, alpha, beta, 1, tt, deadline, stats, cancel, reductions
+        )
+    score, move = _pvs(
+        board, depth, -beta, -alpha, -1, tt, deadline, stats, cancel, reductions
+    )
+    return -score, move
+
+
+def pvs_lmr(
+    board,
+    depth,
+    alpha,
+    beta,
+    maximizing,
+    tt=None,
+    deadline=None,
+    stats=None,
+    cancel=None,
+):
+    return pvs(
+        board, depth, alpha, beta, maximizing, tt, deadline, stats, cancel, True
+    )
+
+
+def _pvs(board, depth, alpha, beta, sign, tt, deadline, stats, cancel, reductions):
+    # Negamax: scores are from the side to move, which is AI when sign is 1.
+    # Table entries keep alpha_beta's scores and bounds, from AI's side.
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if cancel is not None and cancel.is_set():
+        raise SearchTimeout()
+    if stats is not None:
+        stats.nodes += 1
+
+    key = None
+    tt_move = None
+    if tt is not None:
+        key, frame = board.tt_key(sign > 0)
+        entry = tt.lookup(key)
+        if stats is not None:
+            stats.tt_probes += 1
+            stats.tt_hits += entry is not None
+        if entry is not None:
+            _, entry_depth, entry_score, flag, tt_move, _ = entry
+            tt_move = board.from_frame(frame, tt_move)
+            entry_score *= sign
+            if sign < 0 and flag != EXACT:
+                flag = LOWER if flag == UPPER else UPPER
+            if entry_depth >= depth and (
+                flag == EXACT
+                or (flag == LOWER and entry_score >= beta)
+                or (flag == UPPER and entry_score <= alpha)
+            ):
+                return entry_score, tt_move
+
+    if stats is None:
+        score = sign * board.evaluate()
+    else:
+        started = time.perf_counter()
+        score = sign * board.evaluate()
+        stats.eval_time += time.perf_counter() - started
+    if abs(score) >= 100000 or depth == 0:
+        if stats is not None:
+            stats.leaves += 1
+        return score, None
+
+    if stats is None:
+        moves = board.get_nearby_moves(depth=depth, tt_move=tt_move)
+    else:
+        started = time.perf_counter()
+        moves = board.get_nearby_moves(depth=depth, tt_move=tt_move)
+        stats.movegen_time += time.perf_counter() - started
+    if not moves:
+        # A full board is scored like a leaf
+        if stats is not None:
+            stats.leaves += 1
+        return score, None
+    if stats is not None:
+        stats.expanded += 1
+    alpha_orig = alpha
+    player = AI if sign > 0 else HUMAN
+
+    def search(child_depth, low, high):
+        # The score of the move just made, searched in the window (low, high)
+        score, _ = _pvs(
+            board,
+            child_depth,
+            -high,
+            -low,
+            -sign,
+            tt,
+            deadline,
+            stats,
+            cancel,
+            reductions,
+        )
+        return -score
+
+    best_score = -math.inf
+    best_move = None
+    for i, move in enumerate(moves):
+        if not board.make_move(*move, player):
+            # Nothing was placed, so there is nothing to undo
+            continue
+        try:
+            if best_move is None:
+                score = search(depth - 1, alpha, beta)
+            else:
+                # Scores are integers, so (alpha, alpha + 1) is a null window
+                reduced = reductions and depth >= LMR_DEPTH and i >= LMR_MOVES
+                score = search(depth - 1 - reduced, alpha, alpha + 1)
+                if reduced and score > alpha:
+                    score = search(depth - 1, alpha, alpha + 1)
+                if alpha < score < beta:
+                    if stats is not None:
+                        stats.researches += 1
+                    score = search(depth - 1, alpha, beta)
+                if stats is not None:
+                    stats.reductions += reduced
+        finally:
+            # Leave the board intact when a timeout unwinds the search
+            board.undo_move(*move)
+        if score > best_score:
+            best_score = score
+            best_move = move
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            board.ordering.record_cutoff(move, depth)
+            break
+    if stats is not None:
+        stats.children += i + 1
+        if alpha >= beta:
+            stats.cutoffs += 1
+            stats.first_move_cutoffs += i == 0
+
+    if tt is not None:
+        if best_score <= alpha_orig:
+            flag = UPPER if sign > 0 else LOWER
+        elif best_score >= beta:
+            flag = LOWER if sign > 0 else UPPER
+        else:
+            flag = EXACT
+        tt.store(
+            key, depth, sign * best_score, flag, board.to_frame(frame, best_move)
+        )
+    return best_score, best_move
@@ -0,0 +1,130 @@
+# Opt-in search instrumentation. Searches take a SearchStats (or None, in
+# which case they skip all bookkeeping) and fill in its counters.
+import json
+import logging
+import time
+
+logger = logging.getLogger("gomoku.search")
+
+
+class SearchStats:
+    def __init__(self, agent=None):
+        self.agent = agent
+        self.nodes = 0
+        self.leaves = 0
+        # Interior nodes that generated moves, and the children they searched
+        self.expanded = 0
+        self.children = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        # Principal variation search: null-window searches that failed high
+        # and were searched again, and late moves searched at reduced depth
+        self.researches = 0
+        self.reductions = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.threat_nodes = 0
+        self.eval_time = 0.0
+        self.movegen_time = 0.0
+        self.depth = 0
+        self.score = None
+        self.move = None
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self, depth, score, move):
+        self.depth = depth
+        self.score = score
+        self.move = move
+        self.elapsed = time.perf_counter() - self.started
+
+    def merge(self, counters):
+        # Adds counters reported by another process (see counters())
+        for name, value in counters.items():
+            setattr(self, name, getattr(self, name) + value)
+
+    def counters(self):
+        return {
+            name: getattr(self, name)
+            for name in (
+                "nodes",
+                "leaves",
+                "expanded",
+                "children",
+                "cutoffs",
+                "first_move_cutoffs",
+                "researches",
+                "reductions",
+                "tt_probes",
+                "tt_hits",
+                "threat_nodes",
+                "eval_time",
+                "movegen_time",
+            )
+        }
+
+    def cutoff_rate(self):
+        return self.cutoffs / self.expanded if self.expanded else 0.0
+
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    def branching_factor(self):
+        # Children actually searched per expanded node
+        return self.children / self.expanded if self.expanded else 0.0
+
+    def effective_branching_factor(self):
+        return self.nodes ** (1 / self.depth) if self.depth else 0.0
+
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        record = {"agent": self.agent, "depth": self.depth, "score": self.score}
+        record["move"] = list(self.move) if self.move else None
+        record.update(self.counters())
+        record.update(
+            elapsed=self.elapsed,
+            nodes_per_second=self.nodes_per_second(),
+            cutoff_rate=self.cutoff_rate(),
+            first_move_cutoff_rate=self.first_move_cutoff_rate(),
+            tt_hit_rate=self.tt_hit_rate(),
+            branching_factor=self.branching_factor(),
+            effective_branching_factor=self.effective_branching_factor(),
+        )
+        return record
+
+    def log(self):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(self.as_dict(), sort_keys=True))
+
+
+class GameStats:
+    # The SearchStats of every move an agent made in one game
+    def __init__(self):
+        self.searches = []
+
+    def add(self, stats):
+        self.searches.append(stats)
+
+    def summary(self):
+        total = SearchStats()
+        for stats in self.searches:
+            total.merge(stats.counters())
+        record = total.as_dict()
+        for name in ("agent", "depth", "score", "move", "effective_branching_factor"):
+            del record[name]
+        record["searches"] = len(self.searches)
+        record["elapsed"] = sum(stats.elapsed for stats in self.searches)
+        record["nodes_per_second"] = (
+            total.nodes / record["elapsed"] if record["elapsed"] else 0.0
+        )
+        record["max_depth"] = max((s.depth for s in self.searches), default=0)
+        return record
+
+    def write_jsonl(self, file):
+        for stats in self.searches:
+            file.write(json.dumps(stats.as_dict(), sort_keys=True) + "\n")
@@ -0,0 +1,103 @@
+# The 8 symmetries of the square board (rotations and reflections) and the
+# canonical hash that folds symmetric positions together
+from board import BLACK, WHITE, WIN_LENGTH
+from zobrist import zobrist_keys
+
+# (row, col) -> (row, col) on a board of the given size
+TRANSFORMS = (
+    lambda row, col, size: (row, col),
+    lambda row, col, size: (col, size - 1 - row),
+    lambda row, col, size: (size - 1 - row, size - 1 - col),
+    lambda row, col, size: (size - 1 - col, row),
+    lambda row, col, size: (row, size - 1 - col),
+    lambda row, col, size: (col, row),
+    lambda row, col, size: (size - 1 - row, col),
+    lambda row, col, size: (size - 1 - col, size - 1 - row),
+)
+
+# INVERSE[t] undoes TRANSFORMS[t]
+INVERSE = tuple(
+    next(u for u in range(8) if TRANSFORMS[u](*TRANSFORMS[t](0, 1, 5), 5) == (0, 1))
+    for t in range(8)
+)
+
+_symmetry_keys = {}
+
+
+def to_canonical(t, move, size):
+    # A move on the board into the frame of its canonical position
+    return None if move is None else TRANSFORMS[t](*move, size)
+
+
+def from_canonical(t, move, size):
+    return None if move is None else TRANSFORMS[INVERSE[t]](*move, size)
+
+
+def symmetry_keys(size, win_length=WIN_LENGTH):
+    # For every transform, the black and white Zobrist keys of each padded
+    # cell's image, so XOR-ing them over the stones hashes the image
+    table = _symmetry_keys.get((size, win_length))
+    if table is None:
+        black, white = zobrist_keys(size, win_length)
+        stride = size + 1
+        table = []
+        for image in TRANSFORMS:
+            # Padding cells never hold a stone, so what they map to is moot
+            cells = [0] * (size * stride)
+            for row in range(size):
+                for col in range(size):
+                    image_row, image_col = image(row, col, size)
+                    cells[row * stride + col] = image_row * stride + image_col
+            table.append(([black[i] for i in cells], [white[i] for i in cells]))
+        _symmetry_keys[(size, win_length)] = table
+    return table
+
+
+class CanonicalHash:
+    # Keeps the Zobrist hashes of all 8 images of the position up to date
+    # on place/remove, next to the board's own hash
+    def __init__(self, board):
+        self.board = board
+        table = symmetry_keys(board.size, board.win_length)
+        self.black_keys = [black for black, _ in table]
+        self.white_keys = [white for _, white in table]
+        self.hashes = [0] * 8
+        for color in (BLACK, WHITE):
+            for row, col in board.cells(board.bits(color)):
+                self.on_place(row, col, color)
+        board.attach(self)
+
+    def close(self):
+        self.board.detach(self)
+
+    def on_place(self, row, col, color):
+        index = row * self.board.stride + col
+        hashes = self.hashes
+        keys = self.black_keys if color == BLACK else self.white_keys
+        for t in range(8):
+            hashes[t] ^= keys[t][index]
+
+    on_remove = on_place
+
+    def canonical(self):
+        key = min(self.hashes)
+        return key, self.hashes.index(key)
+
+
+def canonical(board):
+    # (hash, t): the smallest Zobrist hash over the 8 images of the position
+    # and the transform producing it. Moves map into the canonical frame
+    # with to_canonical(t, ...) and back with from_canonical(t, ...).
+    for tracker in board.trackers:
+        if isinstance(tracker, CanonicalHash):
+            return tracker.canonical()
+    hashes = [0] * 8
+    stride = board.stride
+    for t, (black, white) in enumerate(
+        symmetry_keys(board.size, board.win_length)
+    ):
+        for keys, bits in ((black, board.black), (white, board.white)):
+            for row, col in board.cells(bits):
+                hashes[t] ^= keys[row * stride + col]
+    key = min(hashes)
+    return key, hashes.index(key)
@@ -0,0 +1,61 @@
+# Immediate tactics: cells that win at once and cells that have to be blocked.
+# Agents ask for these before searching, so forced moves cost no search.
+import weakref
+
+from board import BLACK, WHITE, opponent
+from windows import WindowCounts
+
+
+class Tactics(WindowCounts):
+    # Window counts of a board that is not tracked on every move: they are
+    # brought up to date from the stones changed since the last query
+    def __init__(self, board):
+        super().__init__(board, attach=False)
+        # The stones the counts were last brought up to date with
+        self.synced = {BLACK: board.black, WHITE: board.white}
+
+    def sync(self):
+        # Applies only the stones placed or removed since the last sync, so
+        # searches moving stones on the board pay nothing for the counts
+        board = self.board
+        if self.synced[BLACK] == board.black and self.synced[WHITE] == board.white:
+            return
+        for color in (BLACK, WHITE):
+            bits = board.bits(color)
+            for row, col in board.cells(self.synced[color] & ~bits):
+                self.on_remove(row, col, color)
+            self.synced[color] &= bits
+        for color in (BLACK, WHITE):
+            bits = board.bits(color)
+            for row, col in board.cells(bits & ~self.synced[color]):
+                self.on_place(row, col, color)
+            self.synced[color] = bits
+
+    def winning_cells(self, color):
+        self.sync()
+        return super().winning_cells(color)
+
+    def precheck(self, color):
+        # (cells where `color` wins now, cells it has to block)
+        return self.winning_cells(color), self.winning_cells(opponent(color))
+
+
+# One Tactics per board, shared by every agent playing on it
+_tactics = weakref.WeakKeyDictionary()
+
+
+def tactics_for(board):
+    tactics = _tactics.get(board)
+    if tactics is None:
+        tactics = _tactics[board] = Tactics(board)
+    return tactics
+
+
+def immediate_move(board, color):
+    # A winning cell, else a cell blocking the opponent's win, else None
+    wins, blocks = tactics_for(board).precheck(color)
+    if wins:
+        return wins[0]
+    if blocks:
+        return blocks[0]
+    return None
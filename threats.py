@@ -0,0 +1,152 @@
+# Threat-space search: proves wins made of continuous fours (VCF) and,
+# optionally, threes (VCT) without searching the full move tree.
+import time
+
+from board import opponent
+from windows import WindowCounts
+
+
+class ThreatSearchExhausted(Exception):
+    pass
+
+
+class ThreatSearch:
+    def __init__(
+        self, max_nodes=5000, time_limit_ms=None, threes=False, max_threes=2
+    ):
+        self.max_nodes = max_nodes
+        self.time_limit_ms = time_limit_ms
+        # Also try threes (VCT), at most max_threes of them in one line
+        self.threes = threes
+        self.max_threes = max_threes
+        self.nodes = 0
+
+    def find_win(self, board, attacker, deadline=None):
+        # Returns a winning line of alternating attacker/defender moves that
+        # starts with the attacker's move, or None if no win was proven
+        # within the budget. `deadline` (a time.perf_counter() value) cuts
+        # the search short of time_limit_ms.
+        self.board = board.copy()
+        self.attacker = attacker
+        self.defender = opponent(attacker)
+        self.win_length = board.win_length
+        # Stones of each colour in every window, kept up to date as the
+        # search places and removes stones
+        self.counts = WindowCounts(self.board)
+        self.cell_windows = self.counts.cell_windows
+        self.nodes = 0
+        self.deadline = deadline
+        if self.time_limit_ms is not None:
+            limit = time.perf_counter() + self.time_limit_ms / 1000
+            self.deadline = limit if deadline is None else min(deadline, limit)
+        self.failed = set()
+        try:
+            line = self._attack(self.max_threes if self.threes else 0)
+        except ThreatSearchExhausted:
+            return None
+        if line is None:
+            return None
+        return [self.board.position(index) for index in line]
+
+    def _place(self, index, color):
+        self.board.place(*self.board.position(index), color)
+
+    def _remove(self, index, color):
+        self.board.remove(*self.board.position(index))
+
+    def _cells(self, color, stones, windows=None):
+        # Empty cells of the windows holding `stones` stones of `color` and
+        # none of the other colour
+        return self.counts.threat_cells(color, stones, windows)
+
+    def _attack(self, threes_left):
+        self.nodes += 1
+        if self.nodes > self.max_nodes or (
+            self.deadline is not None and time.perf_counter() > self.deadline
+        ):
+            raise ThreatSearchExhausted()
+        if (self.board.hash, threes_left) in self.failed:
+            return None
+
+        wins = self._cells(self.attacker, self.win_length - 1)
+        if wins:
+            return [next(iter(wins))]
+        # A four of the defender has to be blocked, and the block must be a
+        # threat itself for the sequence to go on
+        forced = self._cells(self.defender, self.win_length - 1)
+        if len(forced) > 1:
+            return None
+
+        line = self._try_fours(forced, threes_left)
+        if line is None and threes_left:
+            line = self._try_threes(forced, threes_left)
+        if line is None:
+            self.failed.add((self.board.hash, threes_left))
+        return line
+
+    def _try_fours(self, forced, threes_left):
+        fours = self._cells(self.attacker, self.win_length - 2)
+        if forced:
+            fours = {cell: n for cell, n in fours.items() if cell in forced}
+        # Cells making several fours at once first
+        for move in sorted(fours, key=fours.get, reverse=True):
+            self._place(move, self.attacker)
+            try:
+                replies = self._cells(
+                    self.attacker, self.win_length - 1, self.cell_windows[move]
+                )
+                if len(replies) > 1:
+                    # A double four: whichever cell the defender blocks, the
+                    # attacker wins on another
+                    block, win = list(replies)[:2]
+                    return [move, block, win]
+                reply = next(iter(replies))
+                self._place(reply, self.defender)
+                try:
+                    line = self._attack(threes_left)
+                finally:
+                    self._remove(reply, self.defender)
+                if line is not None:
+                    return [move, reply] + line
+            finally:
+                self._remove(move, self.attacker)
+        return None
+
+    def _try_threes(self, forced, threes_left):
+        threes = self._cells(self.attacker, self.win_length - 3)
+        if forced:
+            threes = {cell: n for cell, n in threes.items() if cell in forced}
+        for move in sorted(threes, key=threes.get, reverse=True):
+            self._place(move, self.attacker)
+            try:
+                # It is only a threat if the attacker would win by fours when
+                # the defender ignored it
+                threat = self._attack(0)
+                if threat is None:
+                    continue
+                # The defender answers on the cells of that winning line or
+                # with a four of its own
+                replies = set(threat)
+                replies.update(self._cells(self.defender, self.win_length - 2))
+                main_line = None
+                for reply in sorted(replies):
+                    self._place(reply, self.defender)
+                    try:
+                        line = self._attack(threes_left - 1)
+                    finally:
+                        self._remove(reply, self.defender)
+                    if line is None:
+                        break
+                    if main_line is None:
+                        main_line = [move, reply] + line
+                else:
+                    return main_line
+            finally:
+                self._remove(move, self.attacker)
+        return None
+
+
+def find_forced_win(
+    board, attacker, max_nodes=5000, time_limit_ms=None, threes=False
+):
+    return ThreatSearch(max_nodes, time_limit_ms, threes).find_win(board, attacker)
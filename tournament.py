@@ -0,0 +1,295 @@
+# Headless AI-vs-AI tournaments, e.g.
+#   python tournament.py minimax alphabeta:max_depth=3 --games 20 --workers 4
+import argparse
+import ast
+import csv
+import itertools
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from game import GameEngine, RandomAgent, MinimaxAgent, AlphaBetaAgent
+from records import GameRecord, save
+
+AGENTS = {
+    "random": RandomAgent,
+    "minimax": MinimaxAgent,
+    "alphabeta": AlphaBetaAgent,
+}
+# Agents making random choices, which take the game's own generator
+RANDOMIZED = (RandomAgent, MinimaxAgent)
+
+GAME_FIELDS = (
+    "game",
+    "black",
+    "white",
+    "winner",
+    "moves",
+    "black_ms_per_move",
+    "white_ms_per_move",
+    "seed",
+    "opening",
+)
+
+
+def parse_agent(spec):
+    # "alphabeta:max_depth=3,time_limit_ms=200" -> ("alphabeta", {...})
+    name, _, options = spec.partition(":")
+    if name not in AGENTS:
+        raise ValueError(f"Unknown agent: {name}")
+    kwargs = {}
+    for option in filter(None, options.split(",")):
+        key, _, value = option.partition("=")
+        try:
+            kwargs[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            kwargs[key] = value
+    return name, kwargs
+
+
+def random_opening(rng, board_size, moves):
+    # Distinct cells within two of the centre, played alternately from black
+    center = board_size // 2
+    cells = [
+        (row, col)
+        for row in range(center - 2, center + 3)
+        for col in range(center - 2, center + 3)
+    ]
+    return rng.sample(cells, moves)
+
+
+def play_game(
+    black_spec,
+    white_spec,
+    seed=0,
+    opening_moves=2,
+    max_moves=None,
+    board_size=15,
+    win_length=5,
+):
+    # Plays one game without printing or sleeping and returns its record.
+    # The opening and the agents' random choices come from one generator
+    # seeded with `seed`, leaving the global one alone.
+    rng = random.Random(seed)
+    engine = GameEngine(board_size, win_length)
+    opening = random_opening(rng, engine.BOARD_SIZE, opening_moves)
+    for row, col in opening:
+        engine.play_move(row, col)
+    agents = {}
+    for color, spec in (("black", black_spec), ("white", white_spec)):
+        name, kwargs = parse_agent(spec)
+        if AGENTS[name] in RANDOMIZED:
+            kwargs.setdefault("rng", rng)
+        agents[color] = AGENTS[name](engine, color, **kwargs)
+    think_time = {"black": 0.0, "white": 0.0}
+    move_counts = {"black": 0, "white": 0}
+    moves = list(opening)
+    winner = None
+    while not engine.is_game_over():
+        if max_moves is not None and len(moves) >= max_moves:
+            break
+        color = engine.get_current_player()
+        start = time.perf_counter()
+        move = agents[color].get_move()
+        think_time[color] += time.perf_counter() - start
+        move_counts[color] += 1
+        if move is None or not engine.play_move(*move):
+            # An agent without a legal move forfeits
+            winner = "white" if color == "black" else "black"
+            break
+        moves.append(tuple(move))
+    else:
+        winner = engine.get_winner()
+    for agent in agents.values():
+        if hasattr(agent, "close"):
+            agent.close()
+    record = {"black": black_spec, "white": white_spec, "winner": winner}
+    record["moves"] = moves
+    for color in ("black", "white"):
+        record[f"{color}_ms_per_move"] = (
+            1000 * think_time[color] / max(move_counts[color], 1)
+        )
+    record["seed"] = seed
+    record["opening"] = opening_moves
+    return record
+
+
+def _play_game_task(args):
+    return play_game(*args)
+
+
+def elo_difference(score, games):
+    # Elo difference implied by a score fraction, clamped away from 0 and 1
+    if not games:
+        return 0.0
+    score = min(max(score, 0.5 / games), 1 - 0.5 / games)
+    return -400 * math.log10(1 / score - 1)
+
+
+def schedule(
+    agents,
+    games,
+    seed=0,
+    opening_moves=2,
+    max_moves=None,
+    board_size=15,
+    win_length=5,
+):
+    # Every pair plays `games` games. Consecutive games share an opening
+    # with colours swapped, so neither agent profits from a lucky start.
+    # Returns (black index, white index, play_game arguments) per game;
+    # agents are told apart by their index, as one spec may play itself.
+    tasks = []
+    for first, second in itertools.combinations(range(len(agents)), 2):
+        for i in range(games):
+            game_seed = seed + i // 2
+            black, white = (first, second) if i % 2 == 0 else (second, first)
+            tasks.append(
+                (
+                    black,
+                    white,
+                    (
+                        agents[black],
+                        agents[white],
+                        game_seed,
+                        opening_moves,
+                        max_moves,
+                        board_size,
+                        win_length,
+                    ),
+                )
+            )
+    return tasks
+
+
+def summarize(agents, results):
+    # Games are matched to agents by the black_agent and white_agent
+    # indices run_tournament adds to them
+    summary = []
+    for first, second in itertools.combinations(range(len(agents)), 2):
+        games = [
+            r
+            for r in results
+            if {r["black_agent"], r["white_agent"]} == {first, second}
+        ]
+        winners = [r[f"{r['winner']}_agent"] for r in games if r["winner"]]
+        wins = winners.count(first)
+        losses = winners.count(second)
+        draws = len(games) - wins - losses
+        score = (wins + 0.5 * draws) / len(games) if games else 0.0
+        ms = {first: [], second: []}
+        for r in games:
+            ms[r["black_agent"]].append(r["black_ms_per_move"])
+            ms[r["white_agent"]].append(r["white_ms_per_move"])
+        summary.append(
+            {
+                "agent": agents[first],
+                "opponent": agents[second],
+                "games": len(games),
+                "wins": wins,
+                "draws": draws,
+                "losses": losses,
+                "score": score,
+                "elo_difference": elo_difference(score, len(games)),
+                "agent_ms_per_move": sum(ms[first]) / max(len(ms[first]), 1),
+                "opponent_ms_per_move": sum(ms[second]) / max(len(ms[second]), 1),
+            }
+        )
+    return summary
+
+
+def run_tournament(
+    agents,
+    games,
+    workers=1,
+    seed=0,
+    opening_moves=2,
+    max_moves=None,
+    board_size=15,
+    win_length=5,
+):
+    for spec in agents:
+        parse_agent(spec)
+    tasks = schedule(
+        agents, games, seed, opening_moves, max_moves, board_size, win_length
+    )
+    arguments = [task for _, _, task in tasks]
+    if workers <= 1:
+        results = list(map(_play_game_task, arguments))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(_play_game_task, arguments))
+    for number, ((black, white, _), result) in enumerate(zip(tasks, results)):
+        result["game"] = number
+        result["black_agent"] = black
+        result["white_agent"] = white
+    return {"summary": summarize(agents, results), "games": results}
+
+
+def write_csv(results, file):
+    writer = csv.DictWriter(file, GAME_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results["games"]:
+        row = dict(result)
+        row["moves"] = len(result["moves"])
+        writer.writerow(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run headless Gomoku AI games")
+    parser.add_argument(
+        "agents",
+        nargs="+",
+        help="agent specs such as random, minimax or alphabeta:max_depth=3",
+    )
+    parser.add_argument("--games", type=int, default=10, help="games per pairing")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--opening-moves", type=int, default=2)
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--size", type=int, default=15, help="board size")
+    parser.add_argument(
+        "--win-length", type=int, default=5, help="stones in a row to win"
+    )
+    parser.add_argument("--json", help="write the summary and all games here")
+    parser.add_argument("--csv", help="write one row per game here")
+    parser.add_argument(
+        "--records", help="write the games as records (binary if it ends in .gmr)"
+    )
+    args = parser.parse_args(argv)
+    if len(args.agents) < 2:
+        parser.error("need at least two agents")
+
+    results = run_tournament(
+        args.agents,
+        args.games,
+        args.workers,
+        args.seed,
+        args.opening_moves,
+        args.max_moves,
+        args.size,
+        args.win_length,
+    )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            write_csv(results, f)
+    if args.records:
+        save(
+            args.records,
+            (
+                GameRecord(r["moves"], args.size, r["winner"])
+                for r in results["games"]
+            ),
+        )
+    json.dump(results["summary"], sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# Stone counts of every winning window (five cells in a row in standard
+# Gomoku), updated on each place/remove through the windows touching the
+# changed cell. Wins, fours, threes and a threat score are read off sets of
+# "open" windows, those holding stones of one colour only.
+from board import BLACK, WHITE
+from lines import window_table
+
+# Score of an open window holding 0..5 stones of its colour
+WINDOW_SCORES = (0, 1, 10, 100, 1000, 100000)
+
+_window_scores = {len(WINDOW_SCORES) - 1: WINDOW_SCORES}
+
+
+def window_scores(win_length):
+    # WINDOW_SCORES for another win length, aligned on the full window
+    scores = _window_scores.get(win_length)
+    if scores is None:
+        shift = len(WINDOW_SCORES) - 1 - win_length
+        scores = _window_scores[win_length] = (0,) + tuple(
+            WINDOW_SCORES[max(1, stones + shift)]
+            for stones in range(1, win_length + 1)
+        )
+    return scores
+
+
+class WindowCounts:
+    # Every window is counted, so all 8 images of a position score alike
+    symmetric = True
+
+    def __init__(self, board, attach=True):
+        self.board = board
+        self.win_length = board.win_length
+        self.windows, self.masks, self.cell_windows = window_table(
+            board.size, board.win_length
+        )
+        self.weights = window_scores(board.win_length)
+        self.counts = {BLACK: [0] * len(self.masks), WHITE: [0] * len(self.masks)}
+        # open[color][n]: the windows holding n stones of `color` and none of
+        # the other, kept for n from three short of a win upwards
+        self.tracked = max(1, self.win_length - 3)
+        self.open = {
+            color: [set() for _ in range(self.win_length + 1)]
+            for color in (BLACK, WHITE)
+        }
+        self.scores = {BLACK: 0, WHITE: 0}
+        for color in (BLACK, WHITE):
+            for row, col in board.cells(board.bits(color)):
+                self.on_place(row, col, color)
+        # Unattached counts are brought up to date by their owner instead
+        self.attached = attach
+        if attach:
+            board.attach(self)
+
+    def close(self):
+        if self.attached:
+            self.board.detach(self)
+            self.attached = False
+
+    def on_place(self, row, col, color):
+        other = WHITE if color == BLACK else BLACK
+        own_counts, other_counts = self.counts[color], self.counts[other]
+        own_open, other_open = self.open[color], self.open[other]
+        weights, tracked = self.weights, self.tracked
+        score = 0
+        other_score = 0
+        for window in self.cell_windows[row * self.board.stride + col]:
+            stones = own_counts[window]
+            own_counts[window] = stones + 1
+            others = other_counts[window]
+            if not others:
+                score += weights[stones + 1] - weights[stones]
+                if stones >= tracked:
+                    own_open[stones].discard(window)
+                if stones + 1 >= tracked:
+                    own_open[stones + 1].add(window)
+            elif not stones:
+                # The other colour's window is blocked
+                other_score -= weights[others]
+                if others >= tracked:
+                    other_open[others].discard(window)
+        self.scores[color] += score
+        self.scores[other] += other_score
+
+    def on_remove(self, row, col, color):
+        other = WHITE if color == BLACK else BLACK
+        own_counts, other_counts = self.counts[color], self.counts[other]
+        own_open, other_open = self.open[color], self.open[other]
+        weights, tracked = self.weights, self.tracked
+        score = 0
+        other_score = 0
+        for window in self.cell_windows[row * self.board.stride + col]:
+            stones = own_counts[window]
+            own_counts[window] = stones - 1
+            others = other_counts[window]
+            if not others:
+                score += weights[stones - 1] - weights[stones]
+                if stones >= tracked:
+                    own_open[stones].discard(window)
+                if stones - 1 >= tracked:
+                    own_open[stones - 1].add(window)
+            elif stones == 1:
+                # The other colour's window is open again
+                other_score += weights[others]
+                if others >= tracked:
+                    other_open[others].add(window)
+        self.scores[color] += score
+        self.scores[other] += other_score
+
+    def score(self, color):
+        return self.scores[color]
+
+    def has_win(self, color):
+        return bool(self.open[color][self.win_length])
+
+    def fours(self, color):
+        # Windows one stone short of a win for `color`
+        return len(self.open[color][self.win_length - 1])
+
+    def threes(self, color):
+        return len(self.open[color][self.win_length - 2])
+
+    def threat_cells(self, color, stones, windows=None):
+        # Empty cells of the open windows holding `stones` stones of `color`
+        # (three short of a win at most), with the number of such windows
+        # through each, in window order. `windows` limits the search to
+        # those windows.
+        open_windows = self.open[color][stones]
+        if windows is None:
+            windows = sorted(open_windows)
+        else:
+            windows = [window for window in windows if window in open_windows]
+        occupied = self.board.black | self.board.white
+        cells = {}
+        for window in windows:
+            for cell in self.windows[window]:
+                if not occupied >> cell & 1:
+                    cells[cell] = cells.get(cell, 0) + 1
+        return cells
+
+    def winning_cells(self, color):
+        # Empty cells completing a win for `color`, in row-major order
+        occupied = self.board.black | self.board.white
+        cells = {
+            (self.masks[window] & ~occupied).bit_length() - 1
+            for window in self.open[color][self.win_length - 1]
+        }
+        return [self.board.position(index) for index in sorted(cells)]
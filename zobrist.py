@@ -0,0 +1,66 @@
+import random
+
+# Bound types stored with transposition table scores
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Mixed into the key when the maximizing side is to move
+SIDE_KEY = random.Random("side").getrandbits(64)
+
+_keys = {}
+
+
+def zobrist_keys(size, win_length=5):
+    # One random 64-bit key per (colour, padded cell index). The generator is
+    # seeded by the board size so every process agrees on the same hashes,
+    # and by any win length other than five so games of different rules
+    # never share hashes in a table or cache.
+    keys = _keys.get((size, win_length))
+    if keys is None:
+        rng = random.Random(size if win_length == 5 else f"{size}/{win_length}")
+        cells = size * (size + 1)
+        black = [rng.getrandbits(64) for _ in range(cells)]
+        white = [rng.getrandbits(64) for _ in range(cells)]
+        keys = _keys[(size, win_length)] = (black, white)
+    return keys
+
+
+class TranspositionTable:
+    REPLACEMENT_POLICIES = ("depth", "always")
+
+    def __init__(self, size=1 << 18, replacement="depth"):
+        if replacement not in self.REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        self.size = size
+        self.replacement = replacement
+        self.generation = 0
+        # Entries are (key, depth, score, flag, move, generation) tuples
+        self.entries = [None] * size
+
+    def new_search(self):
+        # Entries from earlier searches stay usable but lose their
+        # protection against being overwritten by shallower results
+        self.generation += 1
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.generation = 0
+
+    def lookup(self, key):
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        slot = key % self.size
+        old = self.entries[slot]
+        if (
+            self.replacement == "depth"
+            and old is not None
+            and old[5] == self.generation
+            and old[1] > depth
+        ):
+            return
+        self.entries[slot] = (key, depth, score, flag, move, self.generation)